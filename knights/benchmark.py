@@ -0,0 +1,279 @@
+"""
+Benchmarks for the knights logic engine.
+
+Usage: python benchmark.py [characters]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from generate import generate_puzzle
+from logic import *
+from parse import parse_dimacs, parse_formula
+
+CHARACTERS = 2000
+CLAUSES = 50000
+SEARCH_CHARACTERS = 15
+PUZZLE_CHARACTERS = 10
+SEED = 50
+
+
+def build_knowledge(characters, kind, seed=SEED, statements=True):
+    """
+    Builds a large knights-and-knaves style knowledge base from the given
+    sentence classes. `kind` maps connective names to constructors, so the
+    same knowledge base can be built from plain or frozen sentences.
+    Without statements, every knight/knave assignment is a model.
+    """
+    rng = random.Random(seed)
+    knights = [kind["Symbol"](f"{i} is a Knight") for i in range(characters)]
+    knaves = [kind["Symbol"](f"{i} is a Knave") for i in range(characters)]
+    Not_, And_, Or_ = kind["Not"], kind["And"], kind["Or"]
+    Biconditional_ = kind["Biconditional"]
+
+    conjuncts = []
+    for i in range(characters):
+        # each character is exactly one of a knight or a knave
+        conjuncts.append(Biconditional_(knights[i], Not_(knaves[i])))
+        conjuncts.append(Biconditional_(knaves[i], Not_(knights[i])))
+
+        if not statements:
+            continue
+
+        # and says something about two others, which is true iff they're a knight
+        j, k = rng.randrange(characters), rng.randrange(characters)
+        claim = Or_(And_(knights[j], knaves[k]), And_(knaves[j], knights[k]))
+        conjuncts.append(Biconditional_(knights[i], claim))
+    return And_(*conjuncts)
+
+
+PLAIN = {
+    "Symbol": Symbol, "Not": Not, "And": And, "Or": Or,
+    "Biconditional": Biconditional,
+}
+FROZEN = {
+    "Symbol": FrozenSymbol, "Not": FrozenNot, "And": FrozenAnd,
+    "Or": FrozenOr, "Biconditional": FrozenBiconditional,
+}
+
+
+def measure(function):
+    """
+    Returns (result, seconds, peak bytes allocated) for calling function.
+    Time and memory are measured on separate calls, since tracing
+    allocations slows the call down.
+    """
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_construction(characters):
+    """Compares building, hashing and querying plain and frozen knowledge."""
+    print(f"Construction ({characters} characters)")
+    for name, kind in [("plain", PLAIN), ("frozen", FROZEN)]:
+        def build():
+            clear_frozen()
+            return build_knowledge(characters, kind)
+        knowledge, seconds, peak = measure(build)
+        start = time.perf_counter()
+        for _ in range(100):
+            hash(knowledge)
+            knowledge.symbols()
+        queries = time.perf_counter() - start
+        print(f"    {name:8} build {seconds * 1000:8.1f} ms"
+              f"  peak {peak / 1024:8.0f} KiB"
+              f"  100x hash+symbols {queries * 1000:8.1f} ms")
+    clear_frozen()
+
+
+def bench_parallel(characters, max_workers):
+    """Measures model_check_parallel speedup for 1 to max_workers processes."""
+    knowledge = build_knowledge(characters, PLAIN, statements=False)
+    # a tautology that is only decided once every knight symbol is assigned,
+    # so pruning can't cut the search short
+    query = And(*[Or(Symbol(f"{i} is a Knight"), Not(Symbol(f"{i} is a Knight")))
+                  for i in range(characters)])
+    print(f"Parallel model check ({2 * characters} symbols)")
+
+    start = time.perf_counter()
+    expected = model_check(knowledge, query)
+    baseline = time.perf_counter() - start
+    print(f"    sequential  {baseline * 1000:8.1f} ms")
+
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        entailed = model_check_parallel(knowledge, query, workers=workers)
+        seconds = time.perf_counter() - start
+        assert entailed == expected
+        print(f"    {workers:2} workers  {seconds * 1000:8.1f} ms"
+              f"  speedup {baseline / seconds:5.2f}x")
+
+
+def bench_pruning():
+    """Compares models visited by exhaustive and pruned model checking."""
+    import puzzle
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    knowledge = [puzzle.knowledge0, puzzle.knowledge1,
+                 puzzle.knowledge2, puzzle.knowledge3]
+    print("Models visited (all puzzles, all symbols)")
+    for name, check in [("exhaustive", model_check_exhaustive),
+                        ("pruned", model_check)]:
+        stats = dict()
+        start = time.perf_counter()
+        for kb in knowledge:
+            for symbol in symbols:
+                check(kb, symbol, stats)
+        seconds = time.perf_counter() - start
+        print(f"    {name:10} {stats['models']:8} models"
+              f"  {seconds * 1000:8.1f} ms")
+
+
+def bench_simplify():
+    """Compares sentence size and models visited before and after simplify."""
+    import puzzle
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    puzzles = [(knowledge, symbols) for knowledge in (
+        puzzle.knowledge0, puzzle.knowledge1,
+        puzzle.knowledge2, puzzle.knowledge3,
+    )]
+
+    # and a larger generated one
+    generated = generate_puzzle(6, 6, seed=SEED)
+    puzzles.append((generated.knowledge(), generated.symbols()))
+
+    print("Simplification (size, symbols, models visited)")
+    for i, (knowledge, queries) in enumerate(puzzles):
+        stats = dict()
+        simplified = simplify(knowledge, stats)
+        before, after = dict(), dict()
+        for query in queries:
+            assert model_check(knowledge, query, before) == model_check(
+                simplified, query, after)
+        print(f"    {i}: size {stats['size']:4} -> {stats['simplified_size']:4}"
+              f"  symbols {stats['symbols']:3} -> {stats['free_symbols']:3} free"
+              f"  models {before['models']:6} -> {after['models']:6}")
+
+
+def random_cnf(variables, clauses, seed=SEED):
+    """Returns a random 3-CNF problem as DIMACS text."""
+    rng = random.Random(seed)
+    lines = [f"p cnf {variables} {clauses}"]
+    for _ in range(clauses):
+        literals = [rng.choice((1, -1)) * rng.randint(1, variables)
+                    for _ in range(3)]
+        lines.append(" ".join(str(literal) for literal in literals) + " 0")
+    return "\n".join(lines) + "\n"
+
+
+def bench_parse(clauses):
+    """Measures parse throughput against building with the constructors."""
+    # SATLIB files end with "%" and then "0", which isn't an empty clause
+    satlib = parse_dimacs("p cnf 3 2\n1 -2 0\n2 3 0\n%\n0\n")
+    assert len(satlib.conjuncts) == 2 and model_find(satlib) is not None
+
+    text = random_cnf(clauses // 4, clauses)
+    print(f"Parsing ({clauses} clauses)")
+
+    def construct():
+        symbols = dict()
+        conjuncts = []
+        for line in text.splitlines()[1:]:
+            disjuncts = []
+            for word in line.split()[:-1]:
+                literal = int(word)
+                name = f"x{abs(literal)}"
+                if name not in symbols:
+                    symbols[name] = Symbol(name)
+                symbol = symbols[name]
+                disjuncts.append(symbol if literal > 0 else Not(symbol))
+            conjuncts.append(Or(*disjuncts))
+        return And(*conjuncts)
+
+    knowledge = parse_dimacs(text)
+    formula = knowledge.formula()
+    for name, function, size in [
+        ("constructors", construct, len(text)),
+        ("dimacs", lambda: parse_dimacs(text), len(text)),
+        ("formula", lambda: parse_formula(formula), len(formula.encode())),
+    ]:
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        print(f"    {name:12} {seconds * 1000:8.1f} ms"
+              f"  {clauses / seconds:10.0f} clauses/s"
+              f"  {size / seconds / 1e6:6.1f} MB/s")
+
+
+ENGINES = [
+    # (name, solver, largest puzzle worth trying)
+    ("exhaustive", lambda kb, queries: [model_check_exhaustive(kb, query)
+                                        for query in queries], 6),
+    ("pruned", lambda kb, queries: [model_check(kb, query)
+                                    for query in queries], None),
+    ("shared", model_check_many, None),
+    ("simplified", lambda kb, queries: model_check_many(simplify(kb), queries), None),
+    ("parallel", lambda kb, queries: [model_check_parallel(kb, query)
+                                      for query in queries], 6),
+]
+
+
+def bench_engines(max_characters):
+    """Solves generated puzzles of growing size with every engine."""
+    print("Generated puzzles (time, peak memory)")
+    for characters in range(2, max_characters + 1):
+        puzzle = generate_puzzle(characters, characters + 2, seed=characters)
+        knowledge = puzzle.knowledge()
+        queries = puzzle.symbols()
+        results = []
+        for name, solve, limit in ENGINES:
+            if limit is not None and characters > limit:
+                continue
+            answers, seconds, peak = measure(lambda: solve(knowledge, queries))
+            assert answers == puzzle.answers(), name
+            results.append(f"{name} {seconds * 1000:.1f} ms"
+                           f" {peak / 1024:.0f} KiB")
+        print(f"    {characters:2}: " + ", ".join(results))
+
+
+def bench_deep():
+    """Times formula, evaluate and symbols on ever deeper sentences."""
+    print("Deep sentences (formula, evaluate, symbols)")
+    for depth in (1000, 10000, 100000):
+        sentence = Symbol("a")
+        for i in range(depth):
+            sentence = And(Not(sentence), Symbol(f"b{i % 10}"))
+        model = {name: True for name in sentence.symbols()}
+        timings = []
+        for function in (sentence.formula,
+                         lambda: sentence.evaluate(model),
+                         sentence.symbols):
+            start = time.perf_counter()
+            function()
+            timings.append(f"{(time.perf_counter() - start) * 1000:8.1f} ms")
+        print(f"    {depth:6}: " + " ".join(timings))
+
+
+def main():
+    characters = int(sys.argv[1]) if len(sys.argv) > 1 else CHARACTERS
+    bench_construction(characters)
+    bench_pruning()
+    bench_simplify()
+    bench_parse(CLAUSES)
+    bench_deep()
+    bench_engines(PUZZLE_CHARACTERS)
+    bench_parallel(SEARCH_CHARACTERS, os.cpu_count() or 1)
+
+
+if __name__ == "__main__":
+    main()
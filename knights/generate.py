@@ -0,0 +1,145 @@
+"""
+Random knights-and-knaves puzzles with a unique solution.
+
+Usage: python generate.py [characters] [statements] [seed]
+"""
+
+import random
+import sys
+
+from logic import *
+
+
+class Puzzle():
+    def __init__(self, knights, knaves, statements, solution):
+        self.knights = knights
+        self.knaves = knaves
+        # (speaker, claim) pairs
+        self.statements = statements
+        # True for each character who is a knight
+        self.solution = solution
+
+    def rules(self):
+        """Each character is a knight or a knave, but not both."""
+        return [
+            rule
+            for knight, knave in zip(self.knights, self.knaves)
+            for rule in (Biconditional(knight, Not(knave)),
+                         Biconditional(knave, Not(knight)))
+        ]
+
+    def knowledge(self):
+        """Returns the puzzle as a knowledge base."""
+        return And(
+            *self.rules(),
+            *[Biconditional(self.knights[speaker], claim)
+              for speaker, claim in self.statements],
+        )
+
+    def symbols(self):
+        """Returns the symbols a solver should query, as in puzzle.py."""
+        return [symbol for pair in zip(self.knights, self.knaves)
+                for symbol in pair]
+
+    def answers(self):
+        """Returns whether knowledge entails each of symbols()."""
+        return [value for i in range(len(self.knights))
+                for value in (self.solution[i], not self.solution[i])]
+
+
+def random_claim(rng, knights, knaves):
+    """Returns a random claim about one or two characters."""
+    x, y = rng.sample(range(len(knights)), 2) if len(knights) > 1 else (0, 0)
+    kind = rng.randrange(6)
+    if kind == 0:
+        return knights[x]
+    if kind == 1:
+        return knaves[x]
+    if kind == 2:
+        # "we are the same kind"
+        return Or(And(knights[x], knights[y]), And(knaves[x], knaves[y]))
+    if kind == 3:
+        # "we are of different kinds"
+        return Or(And(knights[x], knaves[y]), And(knaves[x], knights[y]))
+    if kind == 4:
+        # "at least one of us is a knave"
+        return Or(knaves[x], knaves[y])
+    return And(knights[x], knights[y])
+
+
+def generate_puzzle(characters, statements, seed=None, attempts=None):
+    """
+    Generates a puzzle with the given number of characters and statements,
+    whose knowledge base entails exactly one assignment of knights and
+    knaves. Raises ValueError if no such puzzle turned up within attempts
+    rounds of swapping statements (10 per character by default).
+    """
+    if characters < 1 or statements < 1:
+        raise ValueError("puzzles need at least one character and statement")
+    # each statement is about its speaker and at most two others, and a
+    # character no statement mentions could be either
+    if 3 * statements < characters:
+        raise ValueError(f"{statements} statements can't mention all"
+                         f" {characters} characters")
+    if attempts is None:
+        attempts = 10 * characters
+    rng = random.Random(seed)
+    names = [chr(ord("A") + i) if i < 26 else f"P{i}"
+             for i in range(characters)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+    solution = [rng.random() < 0.5 for _ in range(characters)]
+    model = dict()
+    for i in range(characters):
+        model[knights[i].name] = solution[i]
+        model[knaves[i].name] = not solution[i]
+
+    def statement(excluding=None):
+        """
+        Returns a random statement true to the hidden solution: knights
+        only make true claims, knaves only false ones. If excluding is a
+        model, the statement must also rule that model out.
+        """
+        for _ in range(attempts * 10):
+            speaker = rng.randrange(characters)
+            claim = random_claim(rng, knights, knaves)
+            if claim.evaluate(model) != solution[speaker]:
+                continue
+            if excluding is not None and (
+                claim.evaluate(excluding) == excluding[knights[speaker].name]
+            ):
+                continue
+            return (speaker, claim)
+        raise ValueError("no statement fits the hidden solution")
+
+    puzzle = Puzzle(knights, knaves,
+                    [statement() for _ in range(statements)], solution)
+    hidden = And(*[knights[i] if solution[i] else knaves[i]
+                   for i in range(characters)])
+    for _ in range(attempts):
+        # Look for a second solution; if there is one, swap a statement for
+        # one that the second solution breaks
+        other = model_find(And(puzzle.knowledge(), Not(hidden)))
+        if other is None:
+            return puzzle
+        puzzle.statements[rng.randrange(statements)] = statement(other)
+    raise ValueError("no uniquely solvable puzzle found")
+
+
+def main():
+    characters = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else characters
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    puzzle = generate_puzzle(characters, statements, seed)
+    for speaker, claim in puzzle.statements:
+        name = puzzle.knights[speaker].name.split()[0]
+        print(f"{name} says {claim.formula()}")
+    print("Solution")
+    knowledge = puzzle.knowledge()
+    for symbol in puzzle.symbols():
+        if model_check(knowledge, symbol):
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
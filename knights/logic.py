@@ -1,10 +1,33 @@
+import concurrent.futures
+import functools
 import itertools
+import multiprocessing
+import os
+import weakref
+import zlib
 
 
 class Sentence():
+    __slots__ = ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
+        return _evaluator(self, partial=False)(model)
+
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave some
+        symbols unassigned. Returns True or False if the assigned symbols
+        decide the sentence, or None if it is still unknown.
+        """
+        return _evaluator(self, partial=True)(model)
+
+    def _value(self, model):
+        """Evaluates the logical sentence by recursion; see _evaluator."""
+        raise Exception("nothing to evaluate")
+
+    def _value_partial(self, model):
+        """Like evaluate_partial, by recursion; see _evaluator."""
         raise Exception("nothing to evaluate")
 
     def formula(self):
@@ -43,6 +66,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -62,6 +86,13 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    _value = evaluate
+    _value_partial = evaluate_partial
+
     def formula(self):
         return self.name
 
@@ -70,98 +101,122 @@ class Symbol(Sentence):
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        return _hash_sentence(self)
 
     def __repr__(self):
-        return f"Not({self.operand})"
+        return _repr(self)
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def _value(self, model):
+        return not self.operand._value(model)
+
+    def _value_partial(self, model):
+        value = self.operand._value_partial(model)
+        return None if value is None else not value
 
     def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+        return _render(self)
 
     def symbols(self):
-        return self.operand.symbols()
+        return _collect_symbols(self)
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return _hash_sentence(self)
 
     def __repr__(self):
-        conjunctions = ", ".join(
-            [str(conjunct) for conjunct in self.conjuncts]
-        )
-        return f"And({conjunctions})"
+        return _repr(self)
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def _value(self, model):
+        for conjunct in self.conjuncts:
+            if not conjunct._value(model):
+                return False
+        return True
+
+    def _value_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct._value_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
 
     def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+        return _render(self)
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return _collect_symbols(self)
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return _hash_sentence(self)
 
     def __repr__(self):
-        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
-        return f"Or({disjuncts})"
-
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+        return _repr(self)
+
+    def _value(self, model):
+        for disjunct in self.disjuncts:
+            if disjunct._value(model):
+                return True
+        return False
+
+    def _value_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct._value_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
 
     def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+        return _render(self)
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return _collect_symbols(self)
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -169,30 +224,39 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return _hash_sentence(self)
 
     def __repr__(self):
-        return f"Implication({self.antecedent}, {self.consequent})"
+        return _repr(self)
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def _value(self, model):
+        return ((not self.antecedent._value(model))
+                or self.consequent._value(model))
+
+    def _value_partial(self, model):
+        antecedent = self.antecedent._value_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent._value_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
 
     def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+        return _render(self)
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return _collect_symbols(self)
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -200,43 +264,672 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return _hash_sentence(self)
 
     def __repr__(self):
-        return f"Biconditional({self.left}, {self.right})"
+        return _repr(self)
+
+    def _value(self, model):
+        # evaluate each side once, or chains of biconditionals take
+        # exponential time
+        return self.left._value(model) == self.right._value(model)
+
+    def _value_partial(self, model):
+        left = self.left._value_partial(model)
+        if left is None:
+            return None
+        right = self.right._value_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def formula(self):
+        return _render(self)
+
+    def symbols(self):
+        return _collect_symbols(self)
+
+
+class Constant(Sentence):
+    """A sentence that is always true or always false."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = bool(value)
+
+    def __eq__(self, other):
+        return isinstance(other, Constant) and self.value == other.value
+
+    def __hash__(self):
+        return hash(("constant", self.value))
+
+    def __repr__(self):
+        return "TRUE" if self.value else "FALSE"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.value
+
+    def evaluate_partial(self, model):
+        return self.value
+
+    _value = evaluate
+    _value_partial = evaluate_partial
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+        return "⊤" if self.value else "⊥"
+
+
+TRUE = Constant(True)
+FALSE = Constant(False)
+
+
+# The connectives compare, hash, render and collect symbols with the explicit
+# stacks below rather than by recursion, so that arbitrarily deep sentences
+# work and each node is visited once. Evaluation is the exception: recursion
+# is faster for the shallow sentences model checking evaluates over and over,
+# so _evaluator checks the depth once up front and only uses the explicit
+# stack for sentences too deep to recurse through.
+
+# The most connectives deep a sentence can be and still be evaluated by
+# recursion; each level takes a stack frame, and callers need some too
+_RECURSION_DEPTH = 100
+
+# The tag each connective hashes under, also used to tell them apart
+_TAGS = {Not: "not", And: "and", Or: "or",
+         Implication: "implies", Biconditional: "biconditional"}
+
+
+def _children(sentence):
+    """Returns the operands of a connective, or None for any other sentence."""
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    return None
+
+
+def _kind(sentence):
+    """Returns the connective class of sentence, or None for a leaf."""
+    for kind in _TAGS:
+        if isinstance(sentence, kind):
+            return kind
+    return None
+
+
+def _fold(sentence, combine, children=_children, done=None):
+    """
+    Works out a value for sentence bottom-up: combine(node, values) gets the
+    values of a connective's operands, or None for a leaf. Nodes shared by
+    several connectives are only combined once.
+
+    done maps the id of each node combined so far to (node, value), keeping
+    the node alive so its id isn't reused; pass the same dict again to reuse
+    the values across calls.
+    """
+    if done is None:
+        done = dict()
+    pending = [(sentence, False)]
+    while pending:
+        node, expanded = pending.pop()
+        if id(node) in done:
+            continue
+        operands = children(node)
+        if operands is None:
+            done[id(node)] = (node, combine(node, None))
+        elif not expanded:
+            pending.append((node, True))
+            pending.extend((operand, False) for operand in operands)
+        else:
+            values = [done[id(operand)][1] for operand in operands]
+            done[id(node)] = (node, combine(node, values))
+    return done[id(sentence)][1]
+
+
+def _shallow(sentence):
+    """Checks if sentence is at most _RECURSION_DEPTH connectives deep."""
+    # a level at a time, so an operand shared by several connectives on
+    # the same level is only looked at once; symbols are skipped early,
+    # since most operands are symbols
+    level = [sentence]
+    for _ in range(_RECURSION_DEPTH):
+        below = dict()
+        for node in level:
+            for child in _children(node) or ():
+                if not isinstance(child, Symbol):
+                    below[id(child)] = child
+        if not below:
+            return True
+        level = below.values()
+    return False
+
+
+def _evaluator(sentence, partial):
+    """
+    Returns a function evaluating sentence in a model, with evaluate_partial
+    if partial: the recursive methods if sentence is shallow enough, or the
+    explicit stack if not. Searches that evaluate the same sentence in many
+    models get this once, rather than checking the depth every time.
+    """
+    if _shallow(sentence):
+        return sentence._value_partial if partial else sentence._value
+    return functools.partial(_evaluate, sentence, partial=partial)
+
+
+def _evaluate(sentence, model, partial):
+    """
+    Evaluates sentence, short-circuiting like the recursive definitions.
+    With partial, unassigned symbols are unknown (None) instead of an error.
+    """
+    # each frame is [connective, operands, index of the operand being
+    # evaluated, value so far]
+    stack = []
+    node = sentence
+    while True:
+
+        # Go down to the first operand of each connective, until a leaf
+        children = _children(node)
+        if children:
+            initial = not isinstance(node, Or)
+            stack.append([node, children, 0, initial])
+            node = children[0]
+            continue
+        if children is not None:
+            # no operands: an empty And is true, an empty Or false
+            value = not isinstance(node, Or)
+        elif partial:
+            value = node.evaluate_partial(model)
+        else:
+            value = node.evaluate(model)
+
+        # Go back up, combining the value with each connective in turn,
+        # until one of them needs another of its operands evaluated
+        while stack:
+            frame = stack[-1]
+            connective, children, index, so_far = frame
+            done = True
+            if isinstance(connective, Not):
+                value = None if value is None else not value
+            elif isinstance(connective, (And, Or)):
+                deciding = isinstance(connective, Or)
+                if value is deciding:
+                    pass
+                else:
+                    if value is None:
+                        frame[3] = None
+                    done = index + 1 == len(children)
+                    value = frame[3]
+            elif isinstance(connective, Implication):
+                if index == 0:
+                    if value is False:
+                        value = True
+                    else:
+                        frame[3] = value
+                        done = False
+                elif value is not True:
+                    value = False if so_far is True and value is False else None
+            elif index == 0:
+                # biconditional
+                if value is not None:
+                    frame[3] = value
+                    done = False
+            elif value is not None:
+                value = None if so_far is None else so_far == value
+
+            if done:
+                stack.pop()
+                continue
+            frame[2] = index + 1
+            node = children[index + 1]
+            break
+        else:
+            return value
+
+
+def _collect_symbols(sentence):
+    """Returns the set of symbol names in sentence."""
+    names = set()
+    seen = set()
+    pending = [sentence]
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Symbol):
+            names.add(node.name)
+        elif isinstance(node, Frozen):
+            names |= node._symbols
+        else:
+            children = _children(node)
+            if children is None:
+                names |= node.symbols()
+            else:
+                pending.extend(children)
+    return names
+
+
+def _equal(sentence, other):
+    """Checks if two sentences have the same structure."""
+    pending = [(sentence, other)]
+    while pending:
+        node, other = pending.pop()
+        if node is other:
+            continue
+        kind = _kind(node)
+        if kind is None:
+            # leaves compare themselves
+            if node != other:
+                return False
+            continue
+        if not isinstance(other, kind):
+            return False
+        children, others = _children(node), _children(other)
+        if len(children) != len(others):
+            return False
+        pending.extend(zip(children, others))
+    return True
+
+
+def _unfrozen_children(sentence):
+    """Like _children, but frozen sentences are leaves: they cache enough."""
+    if isinstance(sentence, Frozen):
+        return None
+    return _children(sentence)
+
+
+def _hash_sentence(sentence):
+    """
+    Returns the hash of a connective, combining the hashes of its operands
+    in the same way as the frozen sentences, so equal ones hash the same.
+    """
+    def combine(node, hashes):
+        if hashes is None:
+            return hash(node)
+        kind = _kind(node)
+        if kind is And or kind is Or:
+            return hash((_TAGS[kind], tuple(hashes)))
+        return hash((_TAGS[kind], *hashes))
+
+    return _fold(sentence, combine, _unfrozen_children)
+
+
+def _repr(sentence):
+    """Returns the repr of a connective, such as `And(a, Not(b))`."""
+    # strings on the stack are written as they are, and sentences are
+    # expanded into more pieces, like the second pass of _render
+    pieces = []
+    pending = [sentence]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, str):
+            pieces.append(node)
+            continue
+        children = _children(node)
+        if children is None:
+            pieces.append(repr(node))
+            continue
+        parts = [f"{_kind(node).__name__}("]
+        for i, child in enumerate(children):
+            if i > 0:
+                parts.append(", ")
+            parts.append(child)
+        parts.append(")")
+        pending.extend(reversed(parts))
+    return "".join(pieces)
+
+
+def _bare(text):
+    """Checks if Sentence.parenthesize would leave text as it is."""
+    return Sentence.parenthesize(text) is text
+
+
+def _render(sentence):
+    """
+    Returns the formula for sentence, in time linear in its length.
+
+    Sentence.parenthesize looks at the rendered text of each operand, which
+    is quadratic for deep sentences. Instead, whether each operand needs
+    parentheses is worked out first from the structure, bottom-up, and then
+    the pieces of the formula are written out once and joined.
+    """
+    separators = {And: " ∧ ", Or: " ∨  "}
+
+    def written(node):
+        """
+        Returns the formula of a node that is written out as a whole: a
+        leaf, or a frozen sentence (other than this one) that has already
+        cached its formula. Returns None for anything to expand.
+        """
+        if isinstance(node, Frozen) and node is not sentence:
+            if node._formula is not None:
+                return node._formula
+        if _children(node) is None:
+            return node.formula()
+        return None
+
+    # Pass 1: for each node, would parenthesize leave its formula bare?
+    bare = dict()
+    pending = [(sentence, False)]
+    while pending:
+        node, expanded = pending.pop()
+        if id(node) in bare:
+            continue
+        text = written(node)
+        if text is not None:
+            bare[id(node)] = _bare(text)
+            continue
+        children = _children(node)
+        if not expanded:
+            pending.append((node, True))
+            pending.extend((child, False) for child in children)
+        elif isinstance(node, (And, Or)) and len(children) < 2:
+            # one operand is written as it is, and none writes nothing
+            bare[id(node)] = not children or bare[id(children[0])]
+        else:
+            bare[id(node)] = False
+
+    # Pass 2: write out the pieces; strings on the stack are written as
+    # they are, and sentences are expanded into more pieces
+    pieces = []
+    pending = [sentence]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, str):
+            pieces.append(node)
+            continue
+        text = written(node)
+        if text is not None:
+            pieces.append(text)
+            continue
+        children = _children(node)
+        if isinstance(node, (And, Or)) and len(children) == 1:
+            pending.append(children[0])
+            continue
+
+        parts = []
+        if isinstance(node, Not):
+            parts.append("¬")
+            separator = ""
+        elif isinstance(node, Implication):
+            separator = " => "
+        elif isinstance(node, Biconditional):
+            separator = " <=> "
+        else:
+            separator = separators[And if isinstance(node, And) else Or]
+        for i, child in enumerate(children):
+            if i > 0:
+                parts.append(separator)
+            if bare[id(child)]:
+                parts.append(child)
+            else:
+                parts.extend(("(", child, ")"))
+        pending.extend(reversed(parts))
+    return "".join(pieces)
+
+
+# Frozen sentences are an immutable, hash-consed alternative to the classes
+# above. Building a frozen sentence looks it up in a table first, so
+# structurally identical frozen sentences are the same object, and each node
+# caches its hash, its symbols and its formula when it is created. The table
+# only holds weak references, so a node is dropped from it once nothing else
+# uses it.
+_frozen = weakref.WeakValueDictionary()
+
+
+def freeze(sentence):
+    """Returns the frozen, hash-consed equivalent of a logical sentence."""
+    Sentence.validate(sentence)
+    if isinstance(sentence, Frozen):
+        return sentence
+
+    # freeze the operands first, so each frozen constructor below only
+    # gets operands that are frozen already
+    def combine(node, operands):
+        if operands is not None:
+            return _FROZEN[_kind(node)](*operands)
+        if isinstance(node, Frozen):
+            return node
+        if isinstance(node, Constant):
+            return FrozenConstant(node.value)
+        if isinstance(node, Symbol):
+            return FrozenSymbol(node.name)
+        raise TypeError(f"cannot freeze {type(node).__name__}")
+
+    return _fold(sentence, combine, _unfrozen_children)
+
+
+def frozen_count():
+    """Returns the number of distinct frozen sentences alive in the table."""
+    return len(_frozen)
+
+
+def clear_frozen():
+    """
+    Empties the hash-consing table. Nodes still in use stay valid, but
+    sentences built afterwards no longer share them.
+    """
+    _frozen.clear()
+
+
+class Frozen(Sentence):
+    """Shared behaviour for immutable, hash-consed sentences."""
+    __slots__ = ()
+
+    @classmethod
+    def _intern(cls, key, fields, hash_value, symbols):
+        """Returns the node for key, creating it from fields if needed."""
+        node = _frozen.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(node, name, value)
+            object.__setattr__(node, "_hash", hash_value)
+            object.__setattr__(node, "_symbols", symbols)
+            object.__setattr__(node, "_formula", None)
+            _frozen[key] = node
+        return node
+
+    def __init__(self, *args):
+        # All of the work is done in __new__
+        pass
+
+    def __setattr__(self, name, value):
+        raise AttributeError("frozen sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def formula(self):
+        if self._formula is None:
+            object.__setattr__(self, "_formula", super().formula())
+        return self._formula
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return set(self._symbols)
+
+
+class FrozenSymbol(Frozen, Symbol):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, name):
+        return cls._intern(
+            (cls, name), {"name": name},
+            hash(("symbol", name)), frozenset((name,))
+        )
+
+    def __reduce__(self):
+        # Rebuild through the constructor so that unpickled frozen
+        # sentences are interned again in the receiving process
+        return (FrozenSymbol, (self.name,))
+
 
+class FrozenNot(Frozen, Not):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def __new__(cls, operand):
+        operand = freeze(operand)
+        return cls._intern(
+            (cls, operand), {"operand": operand},
+            hash(("not", operand._hash)), operand._symbols
+        )
+
+    __hash__ = Frozen.__hash__
+
+    def __eq__(self, other):
+        return self is other or _equal(self, other)
+
+    def __reduce__(self):
+        return (FrozenNot, (self.operand,))
+
+
+class FrozenAnd(Frozen, And):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, *conjuncts):
+        conjuncts = tuple(freeze(conjunct) for conjunct in conjuncts)
+        return cls._intern(
+            (cls, conjuncts), {"conjuncts": conjuncts},
+            hash(("and", tuple(conjunct._hash for conjunct in conjuncts))),
+            frozenset().union(*[conjunct._symbols for conjunct in conjuncts])
+        )
+
+    __hash__ = Frozen.__hash__
+
+    def __eq__(self, other):
+        return self is other or _equal(self, other)
+
+    def add(self, conjunct):
+        raise TypeError("frozen sentences are immutable")
+
+    def __reduce__(self):
+        return (FrozenAnd, self.conjuncts)
+
+
+class FrozenOr(Frozen, Or):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, *disjuncts):
+        disjuncts = tuple(freeze(disjunct) for disjunct in disjuncts)
+        return cls._intern(
+            (cls, disjuncts), {"disjuncts": disjuncts},
+            hash(("or", tuple(disjunct._hash for disjunct in disjuncts))),
+            frozenset().union(*[disjunct._symbols for disjunct in disjuncts])
+        )
+
+    __hash__ = Frozen.__hash__
+
+    def __eq__(self, other):
+        return self is other or _equal(self, other)
+
+    def __reduce__(self):
+        return (FrozenOr, self.disjuncts)
+
+
+class FrozenImplication(Frozen, Implication):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, antecedent, consequent):
+        antecedent = freeze(antecedent)
+        consequent = freeze(consequent)
+        return cls._intern(
+            (cls, antecedent, consequent),
+            {"antecedent": antecedent, "consequent": consequent},
+            hash(("implies", antecedent._hash, consequent._hash)),
+            antecedent._symbols | consequent._symbols
+        )
+
+    __hash__ = Frozen.__hash__
 
-    def check_all(knowledge, query, symbols, model):
+    def __eq__(self, other):
+        return self is other or _equal(self, other)
+
+    def __reduce__(self):
+        return (FrozenImplication, (self.antecedent, self.consequent))
+
+
+class FrozenBiconditional(Frozen, Biconditional):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, left, right):
+        left = freeze(left)
+        right = freeze(right)
+        return cls._intern(
+            (cls, left, right), {"left": left, "right": right},
+            hash(("biconditional", left._hash, right._hash)),
+            left._symbols | right._symbols
+        )
+
+    __hash__ = Frozen.__hash__
+
+    def __eq__(self, other):
+        return self is other or _equal(self, other)
+
+    def __reduce__(self):
+        return (FrozenBiconditional, (self.left, self.right))
+
+
+class FrozenConstant(Frozen, Constant):
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, value):
+        value = bool(value)
+        return cls._intern(
+            (cls, value), {"value": value},
+            hash(("constant", value)), frozenset()
+        )
+
+    __hash__ = Frozen.__hash__
+
+    def __reduce__(self):
+        return (FrozenConstant, (self.value,))
+
+
+# The frozen class for each connective, for freeze
+_FROZEN = {Not: FrozenNot, And: FrozenAnd, Or: FrozenOr,
+           Implication: FrozenImplication, Biconditional: FrozenBiconditional}
+
+
+def model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    Unlike model_check_exhaustive, partial models are evaluated as the search
+    goes, so a whole subtree is skipped as soon as the knowledge base is false
+    in it or the answer is already decided, and symbols are assigned in
+    order_symbols order. If stats is a dict, stats["models"] counts the
+    (partial) models visited.
+    """
+    symbols = order_symbols(knowledge, query)
+    return _check_all(_evaluator(knowledge, partial=True),
+                      _evaluator(query, partial=True), symbols, dict(), stats)
+
+
+def model_check_exhaustive(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, by evaluating it in every model.
+    If stats is a dict, stats["models"] counts the (partial) models visited.
+    """
+
+    def check_all(symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + 1
 
         # If model has an assignment for each symbol
         if not symbols:
 
             # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+            if knowledge_value(model):
+                return query_value(model)
             return True
         else:
 
@@ -253,11 +946,538 @@ def model_check(knowledge, query):
             model_false[p] = False
 
             # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+            return (check_all(remaining, model_true) and
+                    check_all(remaining, model_false))
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    knowledge_value = _evaluator(knowledge, partial=False)
+    query_value = _evaluator(query, partial=False)
+    return check_all(symbols, dict())
+
+
+def order_symbols(knowledge, query):
+    """
+    Returns the symbols of knowledge and query as a list, most constrained
+    first: ordered by the number of top-level conjuncts (and the query) each
+    one appears in, so that assigning them decides sentences early.
+    """
+    sentences = [query]
+    pending = [knowledge]
+    while pending:
+        sentence = pending.pop()
+        if isinstance(sentence, And):
+            pending.extend(sentence.conjuncts)
+        else:
+            sentences.append(sentence)
+
+    counts = dict()
+    for sentence in sentences:
+        for symbol in sentence.symbols():
+            counts[symbol] = counts.get(symbol, 0) + 1
+    return sorted(counts, key=lambda symbol: (-counts[symbol], symbol))
+
+
+# Set in each worker process of model_check_parallel, and set by the parent
+# as soon as any job finds a counter-model, so the other jobs can stop early
+_cancel = None
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _init_worker(cancel):
+    global _cancel
+    _cancel = cancel
+
+
+def _check_all(knowledge, query, symbols, model, stats=None, index=0):
+    """
+    Checks if knowledge base entails query in every completion of a partial
+    model, assigning symbols[index:] in order. knowledge and query are the
+    functions from _evaluator that evaluate them partially.
+    """
+    if stats is not None:
+        stats["models"] = stats.get("models", 0) + 1
+
+    # If the knowledge base is already false, no completion is a counter-model
+    known = knowledge(model)
+    if known is False:
+        return True
+
+    # If the query is already true, entailment holds in every completion
+    value = query(model)
+    if value is True:
+        return True
+    if known is True and value is False:
+        return False
+    if index == len(symbols):
+        raise Exception("sentence could not be decided in a complete model")
+
+    # Polling the shared flag is slow, so only do it every few levels
+    if ((len(symbols) - index) % 8 == 0
+            and _cancel is not None and _cancel.is_set()):
+        raise _Cancelled()
+
+    p = symbols[index]
+    try:
+        model[p] = True
+        if not _check_all(knowledge, query, symbols, model, stats, index + 1):
+            return False
+        model[p] = False
+        return _check_all(knowledge, query, symbols, model, stats, index + 1)
+    finally:
+        del model[p]
+
+
+def _check_partial(knowledge, query, symbols, model):
+    """
+    Checks if knowledge base entails query in every completion of a partial
+    model. Returns None if the search was cancelled before it finished.
+    """
+    try:
+        return _check_all(_evaluator(knowledge, partial=True),
+                          _evaluator(query, partial=True), symbols, model)
+    except _Cancelled:
+        return None
+
+
+def model_check_parallel(knowledge, query, workers=None, split=None):
+    """
+    Checks if knowledge base entails query, using a pool of processes.
+
+    The assignments to the first `split` symbols divide the search into
+    2 ** split independent jobs. As soon as one job finds a model where the
+    knowledge base is true and the query is false, the rest are cancelled.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    symbols = order_symbols(knowledge, query)
+    if split is None:
+        # aim for a few jobs per worker, so uneven jobs balance out
+        split = max(workers - 1, 0).bit_length() + 2
+    split = min(split, len(symbols))
+    prefix, rest = symbols[:split], symbols[split:]
+
+    cancel = multiprocessing.Event()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(cancel,)
+    ) as pool:
+        jobs = [
+            pool.submit(_check_partial, knowledge, query, rest,
+                        dict(zip(prefix, values)))
+            for values in itertools.product((True, False), repeat=split)
+        ]
+        for job in concurrent.futures.as_completed(jobs):
+            if job.result() is False:
+                cancel.set()
+                for other in jobs:
+                    other.cancel()
+                return False
+    return True
+
+
+def model_enumerate(knowledge, symbols=None):
+    """
+    Returns a list of every model (over symbols) in which knowledge is true.
+    Searches like model_find, skipping partial models in which knowledge is
+    already false, and filling in the rest of any in which it is already true.
+    """
+    if symbols is None:
+        symbols = knowledge.symbols()
+    order = order_symbols(knowledge, TRUE)
+    order += sorted(set(symbols) - set(order))
+    evaluate = _evaluator(knowledge, partial=True)
+    models = []
+
+    def enumerate_all(model, index):
+        """Appends each completion of model that satisfies knowledge."""
+        known = evaluate(model)
+        if known is False:
+            return
+        if known is True:
+            rest = order[index:]
+            for values in itertools.product((True, False), repeat=len(rest)):
+                completed = dict(model)
+                completed.update(zip(rest, values))
+                models.append(completed)
+            return
+        if index == len(order):
+            raise Exception("sentence could not be decided in a complete model")
+        p = order[index]
+        for value in (True, False):
+            model[p] = value
+            enumerate_all(model, index + 1)
+        del model[p]
+
+    enumerate_all(dict(), 0)
+    return models
+
+
+def model_find(knowledge, symbols=None):
+    """
+    Returns a model (over symbols) in which knowledge is true, or None if
+    there isn't one. Searches like model_check, pruning partial models in
+    which knowledge is already false.
+    """
+    if symbols is None:
+        symbols = knowledge.symbols()
+    order = order_symbols(knowledge, TRUE)
+    order += sorted(set(symbols) - set(order))
+    evaluate = _evaluator(knowledge, partial=True)
+
+    def find(model, index):
+        known = evaluate(model)
+        if known is False:
+            return None
+        if index == len(order):
+            return dict(model) if known else None
+        p = order[index]
+        for value in (True, False):
+            model[p] = value
+            found = find(model, index + 1)
+            if found is not None:
+                return found
+        del model[p]
+        return None
+
+    return find(dict(), 0)
+
+
+class ModelSet():
+    """
+    The set of models in which a knowledge base is true.
+
+    The models are enumerated once, when the set is built, so any number of
+    queries can then be checked for entailment without searching again.
+    """
+
+    def __init__(self, knowledge, symbols=None):
+        self.knowledge = knowledge
+        self.symbols = set(knowledge.symbols())
+        if symbols is not None:
+            self.symbols |= set(symbols)
+        self.models = model_enumerate(knowledge, self.symbols)
+
+    def __len__(self):
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def satisfiable(self):
+        """Returns True if the knowledge base has at least one model."""
+        return len(self.models) > 0
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        evaluate = _evaluator(query, partial=False)
+        extra = query.symbols() - self.symbols
+        if not extra:
+            return all(evaluate(model) for model in self.models)
+
+        # Query mentions symbols the knowledge base doesn't constrain, so it
+        # must hold for every assignment of those symbols too
+        extra = sorted(extra)
+        for model in self.models:
+            for values in itertools.product((True, False), repeat=len(extra)):
+                extended = model.copy()
+                extended.update(zip(extra, values))
+                if not evaluate(extended):
+                    return False
+        return True
+
+
+def model_check_many(knowledge, queries):
+    """
+    Checks if knowledge base entails each query in turn.
+    Returns a list of booleans, one per query, enumerating the models
+    of the knowledge base only once.
+    """
+    queries = list(queries)
+    symbols = set()
+    for query in queries:
+        symbols |= query.symbols()
+    models = ModelSet(knowledge, symbols)
+    return [models.entails(query) for query in queries]
+
+
+def sentence_size(sentence):
+    """Returns the number of nodes in a logical sentence."""
+    size = 0
+    pending = [sentence]
+    while pending:
+        sentence = pending.pop()
+        size += 1
+        if isinstance(sentence, Not):
+            pending.append(sentence.operand)
+        elif isinstance(sentence, And):
+            pending.extend(sentence.conjuncts)
+        elif isinstance(sentence, Or):
+            pending.extend(sentence.disjuncts)
+        elif isinstance(sentence, Implication):
+            pending.extend((sentence.antecedent, sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            pending.extend((sentence.left, sentence.right))
+    return size
+
+
+def simplify(sentence, stats=None):
+    """
+    Returns a simpler sentence, true in exactly the same models.
+
+    Nested conjunctions and disjunctions are flattened, duplicates and
+    double negations removed, biconditionals put in a canonical form and
+    constants propagated. Symbols fixed by a top-level literal (unit) are
+    then substituted into the rest of the sentence, and so are symbols
+    defined by a top-level biconditional with a literal, such as
+    `A is a Knave <=> ¬A is a Knight`, until nothing new turns up. The
+    units and definitions themselves are kept, so entailment is unchanged.
+
+    If stats is a dict, it records the size and symbol count before and
+    after, and the number of symbols left free once units and definitions
+    are taken out.
+    """
+    if stats is not None:
+        stats["size"] = sentence_size(sentence)
+        stats["symbols"] = len(sentence.symbols())
+
+    units = dict()
+    # (symbol name, literal it equals), in the order they were substituted
+    definitions = []
+    while True:
+        sentence = _simplify(sentence)
+        found = _units(sentence)
+        if found is None:
+            sentence = FALSE
+            break
+        new = {name: value for name, value in found.items()
+               if name not in units}
+        if new:
+            if any(units.get(name, value) != value
+                   for name, value in found.items()):
+                sentence = FALSE
+                break
+            units.update(new)
+            sentence = _substitute(sentence, {
+                name: TRUE if value else FALSE for name, value in new.items()
+            })
+            continue
+
+        defined = _definitions(sentence)
+        if not defined:
+            break
+        conjuncts = sentence.conjuncts if isinstance(sentence, And) else [sentence]
+        used = {id(definition) for definition in defined.values()}
+        rest = [conjunct for conjunct in conjuncts if id(conjunct) not in used]
+        replacements = {name: definition.right
+                        for name, definition in defined.items()}
+        definitions.extend(replacements.items())
+        sentence = _substitute(And(*rest), replacements)
+    if sentence == FALSE:
+        units, definitions = dict(), []
+
+    # A definition of a symbol equal to a unit makes that symbol a unit too;
+    # later definitions can define the symbols earlier ones are equal to,
+    # so go through them backwards
+    kept = []
+    for name, literal in reversed(definitions):
+        negated = isinstance(literal, Not)
+        other = literal.operand.name if negated else literal.name
+        if other in units:
+            units[name] = units[other] != negated
+        else:
+            kept.append(Biconditional(Symbol(name), literal))
+    definitions_kept = len(kept)
+
+    if units or kept:
+        literals = [Symbol(name) if value else Not(Symbol(name))
+                    for name, value in sorted(units.items())]
+        if sentence != TRUE:
+            kept.append(sentence)
+        sentence = _simplify(And(*literals, *reversed(kept)))
+
+    if stats is not None:
+        stats["simplified_size"] = sentence_size(sentence)
+        stats["simplified_symbols"] = len(sentence.symbols())
+        stats["free_symbols"] = (stats["simplified_symbols"] - len(units)
+                                 - definitions_kept)
+    return sentence
+
+
+def _units(sentence):
+    """
+    Returns the symbol values fixed by top-level literals of sentence,
+    or None if two of them contradict each other.
+    """
+    conjuncts = sentence.conjuncts if isinstance(sentence, And) else [sentence]
+    units = dict()
+    for conjunct in conjuncts:
+        if isinstance(conjunct, Symbol):
+            name, value = conjunct.name, True
+        elif isinstance(conjunct, Not) and isinstance(conjunct.operand, Symbol):
+            name, value = conjunct.operand.name, False
+        else:
+            continue
+        if units.get(name, value) != value:
+            return None
+        units[name] = value
+    return units
+
+
+def _definitions(sentence):
+    """
+    Returns the top-level conjuncts of a simplified sentence that define
+    a symbol as equal to a literal, `x <=> y` or `x <=> ¬y`, keyed by the
+    name of the symbol on the left. No defined symbol appears in another
+    definition's literal, so they can all be substituted at once.
+    """
+    conjuncts = sentence.conjuncts if isinstance(sentence, And) else [sentence]
+    defined = dict()
+    targets = set()
+    for conjunct in conjuncts:
+        if not (isinstance(conjunct, Biconditional)
+                and isinstance(conjunct.left, Symbol)):
+            continue
+        right = conjunct.right
+        if isinstance(right, Not):
+            right = right.operand
+        if not isinstance(right, Symbol):
+            continue
+        name, other = conjunct.left.name, right.name
+        if name in defined or name in targets or other in defined:
+            continue
+        defined[name] = conjunct
+        targets.add(other)
+    return defined
+
+
+def _substitute(sentence, replacements):
+    """Replaces each symbol named in replacements with its sentence."""
+    def combine(node, operands):
+        if operands is not None:
+            return _kind(node)(*operands)
+        if isinstance(node, Symbol):
+            return replacements.get(node.name, node)
+        return node
+
+    return _fold(sentence, combine)
+
+
+def _negate(sentence):
+    """Returns the negation of sentence, without stacking double negations."""
+    if isinstance(sentence, Not):
+        return sentence.operand
+    if isinstance(sentence, Constant):
+        return FALSE if sentence.value else TRUE
+    return Not(sentence)
+
+
+def _simplify(sentence):
+    """Simplifies sentence bottom-up, without unit propagation."""
+    # Hashing or comparing a simplified operand again at every level above
+    # it would take quadratic time in deep sentences, so each node gets a
+    # digest once instead, and sentences are only compared in full when
+    # their digests match
+    digests = dict()
+
+    def digest(node):
+        """Returns a number that is the same for equal sentences, every run."""
+        def combine(node, values):
+            if values is None:
+                return zlib.crc32(repr(node).encode())
+            return zlib.crc32(f"{_TAGS[_kind(node)]} {values}".encode())
+        return _fold(node, combine, done=digests)
+
+    def same(node, other):
+        return digest(node) == digest(other) and _equal(node, other)
+
+    def order(node):
+        # symbols by name, which reads best, and anything else after them
+        if isinstance(node, Symbol):
+            return (0, node.name, 0)
+        return (1, "", digest(node))
+
+    def combine(node, operands):
+        if operands is None:
+            return node
+
+        if isinstance(node, Not):
+            return _negate(operands[0])
+
+        if isinstance(node, (And, Or)):
+            is_and = isinstance(node, And)
+            kind = And if is_and else Or
+
+            # the constant that decides the whole connective, and the one it ignores
+            absorbing, identity = (FALSE, TRUE) if is_and else (TRUE, FALSE)
+            flattened = []
+            # the items kept so far, by digest
+            seen = dict()
+            for child in operands:
+                nested = [child]
+                if isinstance(child, kind):
+                    nested = child.conjuncts if is_and else child.disjuncts
+                for item in nested:
+                    if item == absorbing:
+                        return absorbing
+                    if item == identity:
+                        continue
+                    kept = seen.setdefault(digest(item), [])
+                    if any(_equal(item, other) for other in kept):
+                        continue
+                    kept.append(item)
+                    flattened.append(item)
+
+            # x together with ¬x decides the connective too
+            for item in flattened:
+                if isinstance(item, Not) and any(
+                    _equal(item.operand, other)
+                    for other in seen.get(digest(item.operand), ())
+                ):
+                    return absorbing
+            if not flattened:
+                return identity
+            if len(flattened) == 1:
+                return flattened[0]
+            return kind(*flattened)
+
+        if isinstance(node, Implication):
+            antecedent, consequent = operands
+            if (antecedent == FALSE or consequent == TRUE
+                    or same(antecedent, consequent)):
+                return TRUE
+            if antecedent == TRUE:
+                return consequent
+            if consequent == FALSE:
+                return _negate(antecedent)
+            return Implication(antecedent, consequent)
+
+        left, right = operands
+
+        # pull negations out of both sides: ¬x <=> y is the same as x <=> ¬y,
+        # so count them and put any left over on the right
+        negated = False
+        if isinstance(left, Not):
+            left, negated = left.operand, not negated
+        if isinstance(right, Not):
+            right, negated = right.operand, not negated
+
+        if isinstance(left, Constant) or isinstance(right, Constant):
+            if isinstance(left, Constant):
+                left, right = right, left
+            if isinstance(left, Constant):
+                return TRUE if (left.value == right.value) != negated else FALSE
+            return left if right.value != negated else _negate(left)
+        if same(left, right):
+            return FALSE if negated else TRUE
+
+        # order the sides, so both ways round are recognised as duplicates
+        if order(right) < order(left):
+            left, right = right, left
+        return Biconditional(left, _negate(right) if negated else right)
+
+    return _fold(sentence, combine)
@@ -0,0 +1,174 @@
+"""
+Parsers that build logical sentences in bulk.
+
+parse_formula reads the syntax written by Sentence.formula(), and
+parse_dimacs reads DIMACS CNF. Both construct nodes directly rather than
+through the sentence constructors, so there is no per-node validation:
+every operand they produce is already known to be a sentence.
+"""
+
+import re
+
+from logic import *
+
+# Tokens are the operators and parentheses; anything between them is a name
+TOKENS = re.compile(r"(<=>|=>|¬|∧|∨|\(|\)|⊤|⊥)")
+
+# Binding strength of each binary operator, and whether it groups rightwards
+BINARY = {
+    "∧": (4, False),
+    "∨": (3, False),
+    "=>": (2, True),
+    "<=>": (1, False),
+}
+NEGATION = 5
+
+
+def _make(cls, **fields):
+    """Creates a sentence node without calling its constructor."""
+    node = cls.__new__(cls)
+    for name, value in fields.items():
+        setattr(node, name, value)
+    return node
+
+
+def parse_formula(text):
+    """
+    Parses a formula written with ¬, ∧, ∨, => and <=>, as produced by
+    Sentence.formula(), and returns the sentence. Chains of the same
+    connective, such as `a ∧ b ∧ c`, become a single And or Or.
+    """
+    symbols = dict()
+    operands = []
+    operators = []
+
+    # Ands and Ors still open to more operands of a flat chain; a node stops
+    # being open once it is wrapped in parentheses
+    chains = set()
+
+    def apply(operator):
+        if operator == "¬":
+            operands.append(_make(Not, operand=operands.pop()))
+            return
+        right = operands.pop()
+        left = operands.pop()
+        if operator in ("∧", "∨"):
+            if operator == "∧":
+                kind, field = And, "conjuncts"
+            else:
+                kind, field = Or, "disjuncts"
+            if type(left) is kind and id(left) in chains:
+                getattr(left, field).append(right)
+                operands.append(left)
+                return
+            node = _make(kind, **{field: [left, right]})
+            chains.add(id(node))
+        elif operator == "=>":
+            node = _make(Implication, antecedent=left, consequent=right)
+        else:
+            node = _make(Biconditional, left=left, right=right)
+        operands.append(node)
+
+    expect_operand = True
+    for token in TOKENS.split(text):
+        token = token.strip()
+        if not token:
+            continue
+
+        if expect_operand:
+            if token == "¬" or token == "(":
+                operators.append(token)
+            elif token in ("⊤", "⊥"):
+                operands.append(TRUE if token == "⊤" else FALSE)
+                expect_operand = False
+            elif token in BINARY or token == ")":
+                raise ValueError(f"expected a sentence before {token!r}")
+            else:
+                if token not in symbols:
+                    symbols[token] = _make(Symbol, name=token)
+                operands.append(symbols[token])
+                expect_operand = False
+            continue
+
+        if token == ")":
+            while operators and operators[-1] != "(":
+                apply(operators.pop())
+            if not operators:
+                raise ValueError("unbalanced parentheses")
+            operators.pop()
+            chains.discard(id(operands[-1]))
+        elif token in BINARY:
+            precedence, right = BINARY[token]
+            while operators and operators[-1] != "(":
+                top = operators[-1]
+                top_precedence = NEGATION if top == "¬" else BINARY[top][0]
+                if top_precedence > precedence or (
+                    top_precedence == precedence and not right
+                ):
+                    apply(operators.pop())
+                else:
+                    break
+            operators.append(token)
+            expect_operand = True
+        else:
+            raise ValueError(f"expected an operator before {token!r}")
+
+    if expect_operand:
+        raise ValueError("formula ends without a sentence")
+    while operators:
+        operator = operators.pop()
+        if operator == "(":
+            raise ValueError("unbalanced parentheses")
+        apply(operator)
+    return operands[0]
+
+
+def parse_dimacs(text, name="x{}"):
+    """
+    Parses a DIMACS CNF problem and returns it as an And of Or clauses.
+    Variable n becomes the symbol name.format(n). Anything after a line
+    starting with %, as SATLIB files have at the end, is ignored.
+    """
+    words = []
+    for line in text.splitlines():
+        line = line.strip()
+        # SATLIB files end with a line of just %, followed by junk
+        if line.startswith("%"):
+            break
+        if not line or line[0] in "cp":
+            continue
+        words.extend(line.split())
+
+    literals = dict()
+    clauses = []
+    clause = []
+    for word in words:
+        sentence = literals.get(word)
+        if sentence is None:
+            literal = int(word)
+            if literal == 0:
+                # an empty clause can never be satisfied
+                if clause:
+                    clauses.append(_make(Or, disjuncts=clause))
+                else:
+                    clauses.append(FALSE)
+                clause = []
+                continue
+            symbol = literals.get(str(abs(literal)))
+            if symbol is None:
+                symbol = _make(Symbol, name=name.format(abs(literal)))
+                literals[str(abs(literal))] = symbol
+            sentence = symbol if literal > 0 else _make(Not, operand=symbol)
+            literals[word] = sentence
+        clause.append(sentence)
+    if clause:
+        clauses.append(_make(Or, disjuncts=clause))
+    if not clauses:
+        return TRUE
+    return _make(And, conjuncts=clauses)
+
+
+def load_dimacs(path, name="x{}"):
+    """Loads a DIMACS CNF file."""
+    with open(path) as f:
+        return parse_dimacs(f.read(), name)
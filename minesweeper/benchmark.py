@@ -0,0 +1,188 @@
+"""
+Benchmarks for the Minesweeper AI.
+
+Usage: python benchmark.py [height] [width] [mines]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from minesweeper import (BitSentence, LinearMinesweeperAI, Minesweeper,
+                         MinesweeperAI, Sentence)
+
+HEIGHT = 100
+WIDTH = 100
+MINES = 2000
+SEED = 50
+
+
+def play_through(game, ai):
+    """
+    Lets the AI play the whole board, the way runner.py does, except that
+    hitting a mine doesn't end the game: the AI is told it's a mine and
+    carries on, so every cell gets played. Returns (seconds for each
+    move, mines hit).
+    """
+    timings = []
+    hit = 0
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                break
+        if game.is_mine(move):
+            hit += 1
+            ai.mark_mine(move)
+        else:
+            ai.add_knowledge(move, game.nearby_mines(move))
+        timings.append(time.perf_counter() - start)
+    return timings, hit
+
+
+def bench_game(height, width, mines, seed=SEED, bitsets=False):
+    """Times every move of a whole board played by the AI."""
+    kind = "bitset" if bitsets else "set"
+    print(f"Whole board ({height}x{width}, {mines} mines, {kind} sentences)")
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, bitsets=bitsets)
+    timings, hit = play_through(game, ai)
+    total = sum(timings)
+    # the slowest tenth of the game, to see if moves get slower as it goes
+    tenth = max(1, len(timings) // 10)
+    print(f"    {len(timings)} moves, {hit} mines hit, {total:.2f} s"
+          f"  mean {total / len(timings) * 1000:.3f} ms"
+          f"  max {max(timings) * 1000:.1f} ms")
+    print(f"    first tenth {sum(timings[:tenth]) / tenth * 1000:.3f} ms/move"
+          f"  last tenth {sum(timings[-tenth:]) / tenth * 1000:.3f} ms/move")
+    print(f"    {len(ai.knowledge)} sentences in the knowledge base")
+
+
+def play_game(game, ai, guess):
+    """
+    Plays a game to the end with the AI, using guess() when there's no
+    known safe move. Returns (True if won, moves made, guesses made).
+    """
+    moves = guesses = 0
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = guess()
+            guesses += 1
+            if move is None:
+                return True, moves, guesses
+        moves += 1
+        if game.is_mine(move):
+            return False, moves, guesses
+        ai.add_knowledge(move, game.nearby_mines(move))
+        if len(ai.moves_made) == game.height * game.width - len(game.mines):
+            return True, moves, guesses
+
+
+def bench_guessing(height, width, mines, games, seed=SEED):
+    """Compares win rates guessing at random and by the odds."""
+    print(f"Guessing ({games} games, {height}x{width}, {mines} mines)")
+    for name in ("random", "best"):
+        won = guesses = 0
+        start = time.perf_counter()
+        for i in range(games):
+            random.seed(seed + i)
+            game = Minesweeper(height=height, width=width, mines=mines)
+            ai = MinesweeperAI(height=height, width=width, mines=mines)
+            guess = ai.make_random_move if name == "random" else ai.make_best_guess
+            result = play_game(game, ai, guess)
+            won += result[0]
+            guesses += result[2]
+        seconds = time.perf_counter() - start
+        print(f"    {name:8} won {won / games:6.1%}"
+              f"  {guesses / games:5.1f} guesses/game  {seconds:6.2f} s")
+
+
+def bench_sentences(height, width):
+    """
+    Compares the memory and speed of set and bitset sentences, using one
+    sentence for the neighbours of every cell on the board.
+    """
+    print(f"Sentences ({height}x{width}, one per cell)")
+    ai = MinesweeperAI(height=height, width=width)
+    neighbours = [ai.get_neighbours((i, j)) for i in range(height) for j in range(width)]
+    for kind in (Sentence, lambda cells, count: BitSentence(cells, count, width)):
+        tracemalloc.start()
+        sentences = [kind(cells, 1) for cells in neighbours]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # each sentence against the one for the cell to its right, which
+        # overlaps it, and against a smaller one inside it
+        inside = [sentence.difference(kind(cells[:2], 0))
+                  for sentence, cells in zip(sentences, neighbours)]
+        start = time.perf_counter()
+        for a, b, c in zip(sentences, sentences[1:], inside):
+            a.issubset(b)
+            c.issubset(a)
+            a.difference(c)
+            hash(a)
+        seconds = time.perf_counter() - start
+        name = "set" if kind is Sentence else "bitset"
+        print(f"    {name:8} {size / len(sentences):6.0f} bytes/sentence"
+              f"  {seconds / len(sentences) * 1e6:6.2f} us per compare+difference+hash")
+
+
+def bench_engines(height, width, mines, games, seed=SEED):
+    """
+    Compares subset and linear inference on the same moves: both AIs are
+    told about every move the subset AI makes, so after each one we can
+    see what each has worked out, and how long it took.
+    """
+    print(f"Inference engines ({games} games, {height}x{width}, {mines} mines)")
+    seconds = [0, 0]
+    deduced = [0, 0]
+    moves = avoided = 0
+    for i in range(games):
+        random.seed(seed + i)
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ais = [MinesweeperAI(height=height, width=width, mines=mines),
+               LinearMinesweeperAI(height=height, width=width, mines=mines)]
+        while True:
+            move = ais[0].make_safe_move()
+            if move is None:
+                # a guess the linear AI wouldn't have had to make
+                if ais[1].make_safe_move() is not None:
+                    avoided += 1
+                move = ais[0].make_random_move()
+                if move is None:
+                    break
+            if game.is_mine(move):
+                for ai in ais:
+                    ai.mark_mine(move)
+                continue
+            revealed = game.reveal(move)
+            moves += 1
+            for n, ai in enumerate(ais):
+                start = time.perf_counter()
+                ai.add_knowledge_many(revealed.items())
+                seconds[n] += time.perf_counter() - start
+                deduced[n] += len(ai.safes - ai.moves_made) + len(ai.mines)
+    for n, name in enumerate(("subsets", "linear")):
+        print(f"    {name:8} {deduced[n] / moves:7.2f} cells known per move"
+              f"  {seconds[n] / moves * 1000:7.3f} ms per move")
+    print(f"    {avoided} guesses the linear AI didn't need")
+
+
+def main():
+    height = int(sys.argv[1]) if len(sys.argv) > 1 else HEIGHT
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else WIDTH
+    mines = int(sys.argv[3]) if len(sys.argv) > 3 else MINES
+    bench_game(height, width, mines)
+    bench_game(height, width, mines, bitsets=True)
+    bench_sentences(height, width)
+    bench_engines(16, 30, 99, 100)
+    bench_guessing(16, 16, 40, 200)
+
+
+if __name__ == "__main__":
+    main()
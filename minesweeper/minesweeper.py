@@ -1,5 +1,15 @@
+import functools
 import itertools
+import math
 import random
+import time
+
+# How long make_best_guess may spend working out the odds, in seconds
+GUESS_BUDGET = 0.5
+
+# Frontier components with more cells than this have their odds estimated,
+# since counting every way to place their mines could take far too long
+MAX_COMPONENT = 48
 
 
 class Minesweeper:
@@ -14,25 +24,49 @@ class Minesweeper:
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        if not 0 <= mines <= height * width:
+            raise ValueError("more mines than cells")
+
+        # The field is flat, one byte per cell, with cell (i, j) at
+        # i * width + j: 1 if it's a mine, and how many of its neighbours are
+        self.is_mine_at = bytearray(height * width)
+        self.counts = bytearray(height * width)
+
+        # Add mines randomly: picking distinct cells straight away, rather
+        # than retrying cells already taken, which gets slow on crowded boards
+        for index in random.sample(range(height * width), mines):
+            self.mines.add(divmod(index, width))
+            self.is_mine_at[index] = 1
+
+        # Count every cell's neighbouring mines at once, by summing the 3x3
+        # square around each cell: first across each row, then down
+        rows = [self.is_mine_at[i * width:(i + 1) * width] for i in range(height)]
+        across = []
+        for row in rows:
+            padded = b"\0" + row + b"\0"
+            across.append([a + b + c for a, b, c in zip(padded, padded[1:], padded[2:])])
+        nothing = [0] * width
+        for i in range(height):
+            above = across[i - 1] if i > 0 else nothing
+            below = across[i + 1] if i < height - 1 else nothing
+            # (the square includes the cell itself, which isn't a neighbour)
+            self.counts[i * width:(i + 1) * width] = bytes(
+                a + b + c - mine for a, b, c, mine in zip(above, across[i], below, rows[i])
+            )
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def board(self):
+        """
+        The field as rows of True (for a mine) or False.
+        """
+        return [
+            [bool(cell) for cell in self.is_mine_at[i * self.width:(i + 1) * self.width]]
+            for i in range(self.height)
+        ]
+
     def print(self):
         """
         Prints a text-based representation
@@ -41,7 +75,7 @@ class Minesweeper:
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine_at[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +84,7 @@ class Minesweeper:
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return self.is_mine_at[i * self.width + j] == 1
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +92,33 @@ class Minesweeper:
         within one row and column of a given cell,
         not including the cell itself.
         """
+        # counted when the mines were placed
+        i, j = cell
+        return self.counts[i * self.width + j]
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Reveals a cell that isn't a mine, and returns a dict of the count
+        of nearby mines for every cell revealed with it. If the cell has
+        no nearby mines, none of its neighbours can be mines either, so
+        they're revealed too, and so on: the whole connected region of
+        cells with no nearby mines is revealed, along with its border.
+        """
+        width = self.width
+        revealed = {cell: self.nearby_mines(cell)}
+        frontier = [cell] if revealed[cell] == 0 else []
+        while frontier:
+            i, j = frontier.pop()
+            for n_i in range(max(0, i - 1), min(self.height, i + 2)):
+                for n_j in range(max(0, j - 1), min(width, j + 2)):
+                    neighbour = (n_i, n_j)
+                    if neighbour in revealed:
+                        continue
+                    count = self.counts[n_i * width + n_j]
+                    revealed[neighbour] = count
+                    if count == 0:
+                        frontier.append(neighbour)
+        return revealed
 
     def won(self):
         """
@@ -98,9 +141,36 @@ class Sentence:
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        # equal sentences hash the same, so a set of them holds no duplicates;
+        # a sentence must come out of any set before its cells change
+        return hash((frozenset(self.cells), self.count))
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def __len__(self):
+        return len(self.cells)
+
+    def keys(self):
+        """
+        Returns what the AI indexes the sentence under: its cells.
+        """
+        return self.cells
+
+    def issubset(self, other):
+        """
+        Checks if all of this sentence's cells are in other's.
+        """
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells in this sentence but not in
+        other, which must be a subset of it.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -137,17 +207,148 @@ class Sentence:
             self.cells.remove(cell)
 
 
+class BitSentence:
+    """
+    A Sentence that keeps its cells as the bits of one integer rather than
+    a set of (i, j) tuples, for a knowledge base about a fifth the size.
+    Subset tests and differences are single integer operations. Cell
+    (i, j) is number i * width + j, and the bits start from the sentence's
+    lowest numbered cell, so that sentences about nearby cells stay small
+    numbers however big the board. Works anywhere a Sentence does.
+
+    It saves memory rather than time: the AI still has to list each
+    sentence's cells to index it, and a loop over the bits is slower than
+    iterating a set, so a whole game runs a little slower than with sets.
+    """
+
+    __slots__ = ("low", "bits", "count", "width")
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.count = count
+        numbers = [i * width + j for i, j in cells]
+        self.low = min(numbers, default=0)
+        self.bits = 0
+        for number in numbers:
+            self.bits |= 1 << (number - self.low)
+
+    def normalise(self):
+        # move the bits down so the lowest is bit 0 again
+        if not self.bits:
+            self.low = 0
+        elif not self.bits & 1:
+            shift = (self.bits & -self.bits).bit_length() - 1
+            self.bits >>= shift
+            self.low += shift
+
+    @property
+    def cells(self):
+        """
+        The set of cells, made from the bits each time it's asked for, so
+        the AI only asks when it needs (i, j) cells: to mark them, or to
+        guess.
+        """
+        cells = set()
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            cells.add(divmod(self.low + lowest.bit_length() - 1, self.width))
+            bits ^= lowest
+        return cells
+
+    def keys(self):
+        """
+        Returns what the AI indexes the sentence under: its cell numbers,
+        which are cheaper to make than (i, j) tuples.
+        """
+        numbers = []
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            numbers.append(self.low + lowest.bit_length() - 1)
+            bits ^= lowest
+        return numbers
+
+    def __eq__(self, other):
+        return (self.bits == other.bits and self.low == other.low
+                and self.count == other.count)
+
+    def __hash__(self):
+        return hash((self.low, self.bits, self.count))
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def issubset(self, other):
+        shift = self.low - other.low
+        # other's lowest cell is after this one's, so it can't have it
+        if shift < 0:
+            return not self.bits
+        return (self.bits << shift) & ~other.bits == 0
+
+    def difference(self, other):
+        shift = other.low - self.low
+        sentence = BitSentence((), self.count - other.count, self.width)
+        if shift >= 0:
+            sentence.bits = self.bits & ~(other.bits << shift)
+        else:
+            sentence.bits = self.bits & ~(other.bits >> -shift)
+        sentence.low = self.low
+        sentence.normalise()
+        return sentence
+
+    def known_mines(self):
+        if len(self) == self.count:
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        if self.count == 0:
+            return self.cells
+        return set()
+
+    def mark_mine(self, cell):
+        if self.remove(cell):
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        self.remove(cell)
+
+    def remove(self, cell):
+        # returns True if the cell was in the sentence
+        index = cell[0] * self.width + cell[1] - self.low
+        if index < 0 or not self.bits >> index & 1:
+            return False
+        self.bits ^= 1 << index
+        self.normalise()
+        return True
+
+
 class MinesweeperAI:
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, bitsets=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Makes a sentence from cells and a count, with its cells in a set
+        # or, with bitsets, as the bits of an integer (smaller, not faster)
+        self.bitsets = bitsets
+        if bitsets:
+            self.sentence = functools.partial(BitSentence, width=width)
+        else:
+            self.sentence = Sentence
+
+        # How many mines there are in total, if we've been told
+        self.total_mines = mines
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -155,8 +356,45 @@ class MinesweeperAI:
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Set of sentences about the game known to be true
+        self.knowledge = set()
+
+        # Which sentences each cell appears in, keyed by the sentences' keys():
+        # the cell itself, or with bitsets its number
+        self.index = dict()
+
+        # Sentences added or changed since conclusions were last drawn
+        self.worklist = []
+
+        # Cells known to be safe that haven't been chosen yet
+        self.safe_moves = set()
+
+        # Mine placements counted for frontier components, by their sentences
+        self.placements = dict()
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it's already known.
+        Returns True if it was added.
+        """
+        if sentence in self.knowledge:
+            return False
+        self.knowledge.add(sentence)
+        for key in sentence.keys():
+            self.index.setdefault(key, set()).add(sentence)
+        return True
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base.
+        """
+        self.knowledge.discard(sentence)
+        for key in sentence.keys():
+            sentences = self.index.get(key)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.index[key]
 
     def mark_mine(self, cell):
         """
@@ -164,8 +402,12 @@ class MinesweeperAI:
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        # only the sentences the cell is in change; they come out of the
+        # knowledge base while they do, since their hash changes
+        for sentence in list(self.index.get(self.key(cell), ())):
+            self.remove_sentence(sentence)
             sentence.mark_mine(cell)
+            self.keep(sentence)
 
     def mark_safe(self, cell):
         """
@@ -173,8 +415,27 @@ class MinesweeperAI:
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sentence in list(self.index.get(self.key(cell), ())):
+            self.remove_sentence(sentence)
             sentence.mark_safe(cell)
+            self.keep(sentence)
+
+    def key(self, cell):
+        """
+        Returns the key a cell is indexed under.
+        """
+        return cell[0] * self.width + cell[1] if self.bitsets else cell
+
+    def keep(self, sentence):
+        """
+        Adds a new or changed sentence to the knowledge base, and to the
+        worklist to draw conclusions from, unless it's already known or
+        has no cells left (so says nothing, and can be thrown away).
+        """
+        if len(sentence) and self.add_sentence(sentence):
+            self.worklist.append(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -191,40 +452,91 @@ class MinesweeperAI:
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
-        new_sentence = Sentence(self.get_neighbours(cell), count)
-        # mark the known mines and safes in this sentence
-        for mine in self.mines:
-            new_sentence.mark_mine(mine)
-        for safe in self.safes:
-            new_sentence.mark_safe(safe)
-        self.knowledge.append(new_sentence)
-        # iterate marking mines, safes, and inferring new sentences until there are no more changes
-        changes = True
-        while changes:
-            changes = self.update_safes_and_mines() or self.infer_new_sentences()
-
-    def infer_new_sentences(self):
-        changes = False
-        # step through each pair of sentences
-        for sentence1 in self.knowledge:
-            for sentence2 in self.knowledge:
-                if sentence1 != sentence2:
-                    # if sentence1 is a subset of sentence2 (either way around would have worked...)
-                    if sentence1.cells.issubset(sentence2.cells):
-                        # create a new sentence, representing the diff of the cells in each
-                        # and the remainder of the count (as discussed in the Background)
-                        new_sentence = Sentence(
-                            sentence2.cells - sentence1.cells,
-                            sentence2.count - sentence1.count,
-                        )
-                        # add the new sentence if it's not already known
-                        if new_sentence not in self.knowledge:
-                            self.knowledge.append(new_sentence)
-                            changes = True
-        # if we made changes, indicate we should iterate
-        return changes
+        self.add_knowledge_many([(cell, count)])
+
+    def add_knowledge_many(self, observations):
+        """
+        Adds knowledge from many safe cells at once, given (cell, count)
+        pairs such as the items of a dict from Minesweeper.reveal, then
+        draws conclusions from all of it together.
+        """
+        observations = [(cell, count) for cell, count in observations
+                        if cell not in self.moves_made]
+        # mark them all safe first, so they're left out of each other's sentences
+        for cell, _ in observations:
+            self.moves_made.add(cell)
+            self.safe_moves.discard(cell)
+            self.mark_safe(cell)
+        for cell, count in observations:
+            # leave the known mines and safes out of the new sentence
+            cells = []
+            for neighbour in self.get_neighbours(cell):
+                if neighbour in self.mines:
+                    count -= 1
+                elif neighbour not in self.safes:
+                    cells.append(neighbour)
+            self.keep(self.sentence(cells, count))
+        self.propagate()
+
+    def propagate(self):
+        """
+        Draws every conclusion that follows from the sentences on the
+        worklist. Only new or changed sentences are ever on it, so the
+        rest of the knowledge base isn't looked at again.
+        """
+        while self.worklist:
+            sentence = self.worklist.pop()
+            # it may have changed, or been thrown away, since it was added
+            if sentence not in self.knowledge:
+                continue
+            # if all its cells are safe, or all are mines, mark them; that
+            # empties the sentence, and puts the others they're in on the worklist
+            safes = sentence.known_safes()
+            mines = sentence.known_mines()
+            for safe in list(safes):
+                self.mark_safe(safe)
+            for mine in list(mines):
+                self.mark_mine(mine)
+            if safes or mines:
+                continue
+            # otherwise compare it with the sentences it overlaps: where one
+            # is a subset of the other, the difference is a new sentence
+            # (as discussed in the Background)
+            for superset in self.supersets(sentence):
+                self.keep(superset.difference(sentence))
+            for subset in self.subsets(sentence):
+                self.keep(sentence.difference(subset))
+
+    def supersets(self, sentence):
+        """
+        Returns the other sentences whose cells include all of sentence's.
+        Those are the sentences in the index under every one of its cells,
+        so only sentences sharing cells with it are ever looked at.
+        """
+        keys = sentence.keys()
+        if not keys:
+            return []
+        # start from the cell in the fewest sentences
+        lists = sorted((self.index.get(key, set()) for key in keys), key=len)
+        found = set(lists[0])
+        for sentences in lists[1:]:
+            found &= sentences
+            if not found:
+                break
+        found.discard(sentence)
+        return list(found)
+
+    def subsets(self, sentence):
+        """
+        Returns the other sentences whose cells are some of sentence's.
+        """
+        found = set()
+        size = len(sentence)
+        for key in sentence.keys():
+            for other in self.index.get(key, ()):
+                if len(other) < size and other.issubset(sentence):
+                    found.add(other)
+        return list(found)
 
     def get_neighbours(self, cell):
         # neighbours are the 8 cells surrounding the given cell
@@ -244,26 +556,6 @@ class MinesweeperAI:
                     neighbours.append(neighbour)
         return neighbours
 
-    def update_safes_and_mines(self):
-        changes = False
-        # step through each sentence
-        for sentence in self.knowledge:
-            # get hold of the safes and mines it knows about
-            sentence_safes = sentence.known_safes().copy()
-            sentence_mines = sentence.known_mines().copy()
-            # mark each safe
-            for safe in sentence_safes:
-                if safe not in self.safes:
-                    changes = True
-                    self.mark_safe(safe)
-            # mark each mine
-            for mine in sentence_mines:
-                if mine not in self.mines:
-                    changes = True
-                    self.mark_mine(mine)
-        # if we made changes, indicate we should iterate
-        return changes
-
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -274,9 +566,8 @@ class MinesweeperAI:
         and self.moves_made, but should not modify any of those values.
         """
         # just find a safe cell that hasn't been chosen yet
-        for safe in self.safes:
-            if safe not in self.moves_made:
-                return safe
+        for safe in self.safe_moves:
+            return safe
         # we only get here if there weren't any safe moves to make
         return None
 
@@ -299,3 +590,432 @@ class MinesweeperAI:
             return random.choice(moves)
         else:
             return None
+
+    def make_best_guess(self, budget=GUESS_BUDGET):
+        """
+        Returns the move least likely to be a mine, for when there's no
+        known safe move (a known safe move is returned if there is one),
+        or None if there are no moves left. The odds come from mine_odds,
+        within the time budget (in seconds).
+        """
+        safe = self.make_safe_move()
+        if safe is not None:
+            return safe
+        odds = self.mine_odds(budget)
+        if not odds:
+            return None
+        # the least likely to be a mine; random among equally likely cells
+        lowest = min(odds.values())
+        return random.choice([cell for cell in odds if odds[cell] <= lowest + 1e-12])
+
+    def mine_odds(self, budget=GUESS_BUDGET):
+        """
+        Returns the odds of each cell not yet chosen or known to be a mine
+        being a mine: the share of all the ways to place the mines that
+        fit the knowledge base (and the total number of mines, if known)
+        that put a mine there.
+
+        Cells in sentences split into components that share no sentences,
+        and each component's placements are counted on its own. Components
+        too big to count within the time budget (in seconds) get estimated
+        odds instead.
+        """
+        unknown = [
+            (i, j) for i in range(self.height) for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
+        deadline = time.perf_counter() + budget
+        odds = dict.fromkeys((cell for cell in unknown if cell in self.safes), 0)
+        estimated = dict()
+        counted = []
+        for component in self.components():
+            result = None
+            if len(component[0]) <= MAX_COMPONENT:
+                result = self.count_placements(component, deadline)
+            if result is None:
+                estimated.update(self.estimate_odds(component))
+            else:
+                counted.append(result)
+        odds.update(estimated)
+
+        # mines left over for the counted components and the cells no
+        # sentence says anything about
+        others = [cell for cell in unknown
+                  if self.key(cell) not in self.index and cell not in odds]
+        left = None
+        if self.total_mines is not None:
+            left = self.total_mines - len(self.mines) - round(sum(estimated.values()))
+        odds.update(self.combine_odds(counted, others, left))
+        return odds
+
+    def components(self):
+        """
+        Returns the sentences split into groups that share no cells, each
+        as (cells, sentences), with its cells in the order they were reached.
+        """
+        seen = set()
+        groups = []
+        for start in self.index:
+            if start in seen:
+                continue
+            seen.add(start)
+            keys = [start]
+            sentences = set()
+            # walk from cell to sentence to cell, by the keys they're indexed under
+            for key in keys:
+                for sentence in self.index[key]:
+                    if sentence in sentences:
+                        continue
+                    sentences.add(sentence)
+                    for other in sentence.keys():
+                        if other not in seen:
+                            seen.add(other)
+                            keys.append(other)
+            if self.bitsets:
+                keys = [divmod(key, self.width) for key in keys]
+            groups.append((keys, list(sentences)))
+        return groups
+
+    def count_placements(self, component, deadline):
+        """
+        Counts the ways to place mines in a component's cells that fit its
+        sentences. Returns (cells, ways, mine_ways), where ways[k] is how
+        many placements have k mines and mine_ways[k][i] is how many of
+        those have a mine in cells[i]; or None if the deadline passes first.
+        Results are remembered, since most components don't change from
+        one move to the next.
+        """
+        cells, sentences = component
+        key = frozenset((frozenset(sentence.cells), sentence.count) for sentence in sentences)
+        if key in self.placements:
+            return self.placements[key]
+
+        n = len(cells)
+        position = {cell: i for i, cell in enumerate(cells)}
+        # for each cell, the sentences it's in; for each sentence, the mines
+        # still to place in it and the cells still to decide
+        cell_sentences = [[] for _ in range(n)]
+        need = []
+        undecided = []
+        for s, sentence in enumerate(sentences):
+            need.append(sentence.count)
+            undecided.append(len(sentence.cells))
+            for cell in sentence.cells:
+                cell_sentences[position[cell]].append(s)
+
+        ways = [0] * (n + 1)
+        mine_ways = [[0] * n for _ in range(n + 1)]
+        placed = []
+        steps = 0
+
+        def place(i):
+            nonlocal steps
+            steps += 1
+            if steps % 1024 == 0 and time.perf_counter() > deadline:
+                raise TimeoutError()
+            if i == n:
+                ways[len(placed)] += 1
+                for j in placed:
+                    mine_ways[len(placed)][j] += 1
+                return
+            for mine in (False, True):
+                # try the cell as safe, then as a mine, as long as every
+                # sentence it's in can still be met
+                fits = True
+                for s in cell_sentences[i]:
+                    left = need[s] - mine
+                    if left < 0 or left > undecided[s] - 1:
+                        fits = False
+                        break
+                if not fits:
+                    continue
+                for s in cell_sentences[i]:
+                    need[s] -= mine
+                    undecided[s] -= 1
+                if mine:
+                    placed.append(i)
+                place(i + 1)
+                if mine:
+                    placed.pop()
+                for s in cell_sentences[i]:
+                    need[s] += mine
+                    undecided[s] += 1
+
+        try:
+            place(0)
+        except TimeoutError:
+            return None
+        result = (cells, ways, mine_ways)
+        self.placements[key] = result
+        return result
+
+    def estimate_odds(self, component):
+        """
+        Returns rough odds of each cell in a component being a mine: the
+        highest share of mines among the cells of any sentence it's in.
+        """
+        cells, sentences = component
+        odds = dict.fromkeys(cells, 0)
+        for sentence in sentences:
+            share = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                odds[cell] = max(odds[cell], share)
+        return odds
+
+    def combine_odds(self, counted, others, left):
+        """
+        Returns the odds of each cell being a mine, given the counted
+        components, the other unknown cells, and how many mines are left
+        among all of them (None if unknown). A placement of k mines in the
+        components leaves left - k for the others, which can go in
+        comb(len(others), left - k) ways, so that's how much it counts.
+        """
+        # totals[k]: ways to place k mines across all the components
+        totals = [1]
+        for _, ways, _ in counted:
+            totals = convolve(totals, ways)
+
+        weight = []
+        for k in range(len(totals)):
+            if left is None:
+                weight.append(1)
+            elif not 0 <= left - k <= len(others):
+                weight.append(0)
+            else:
+                weight.append(math.comb(len(others), left - k))
+
+        total = sum(ways * weight[k] for k, ways in enumerate(totals))
+        odds = dict()
+        if total == 0:
+            # the knowledge base doesn't fit the mine count; fall back to
+            # treating every cell alike
+            for cells, _, _ in counted:
+                odds.update(dict.fromkeys(cells, 0.5))
+            odds.update(dict.fromkeys(others, 0.5))
+            return odds
+
+        for c, (cells, ways, mine_ways) in enumerate(counted):
+            # ways to place k mines in every component but this one
+            rest = [1]
+            for d, (_, other_ways, _) in enumerate(counted):
+                if d != c:
+                    rest = convolve(rest, other_ways)
+            for i, cell in enumerate(cells):
+                mine = sum(
+                    mine_ways[k][i] * ways_rest * weight[k + r]
+                    for k in range(len(ways)) if mine_ways[k][i]
+                    for r, ways_rest in enumerate(rest) if ways_rest
+                )
+                odds[cell] = mine / total
+
+        if others:
+            if left is None:
+                # no mine count to go on, so assume the others are like the rest
+                share = sum(odds.values()) / len(odds) if odds else 0.5
+            else:
+                # each of the others is a mine in (left - k) / len(others) of
+                # the placements leaving left - k mines for them
+                share = sum(
+                    ways * weight[k] * (left - k)
+                    for k, ways in enumerate(totals)
+                ) / (len(others) * total)
+            odds.update(dict.fromkeys(others, share))
+        return odds
+
+
+class LinearMinesweeperAI(MinesweeperAI):
+    """
+    Minesweeper player that draws conclusions by linear algebra rather than
+    by comparing pairs of sentences. Each sentence is an equation: the sum
+    of its cells (1 for a mine, 0 for safe) is its count. The equations are
+    kept in reduced row echelon form as they arrive, and each one is then
+    checked against the bounds its cells put on it: if the count is as low
+    (or high) as it could possibly be, every cell in it is decided. This
+    finds conclusions that need three or more sentences together.
+    """
+
+    def __init__(self, height=8, width=8, mines=None, bitsets=False):
+        super().__init__(height, width, mines, bitsets)
+
+        # Each row is a dict of cell to (whole number) coefficient, and a
+        # total, both scaled so they have no common factor
+        self.rows = dict()
+        self.next_row = 0
+
+        # The row each pivot cell leads, and the rows each cell is in
+        self.pivots = dict()
+        self.columns = dict()
+
+        # Rows changed since their bounds were last checked
+        self.dirty = set()
+
+    def mark_mine(self, cell):
+        super().mark_mine(cell)
+        self.substitute(cell, 1)
+
+    def mark_safe(self, cell):
+        super().mark_safe(cell)
+        self.substitute(cell, 0)
+
+    def propagate(self):
+        """
+        Adds the new and changed sentences on the worklist to the matrix,
+        draws the conclusions comparing sentences gives, then marks every
+        cell the rows' bounds decide, until nothing more can be concluded.
+        Reduced rows don't always show what a difference of two sentences
+        would, so this finds everything MinesweeperAI does and more.
+        """
+        while True:
+            for sentence in self.worklist:
+                if sentence in self.knowledge:
+                    # changed sentences reduce to nothing against the rows
+                    # they came from, so adding them again costs a reduction
+                    self.add_row({cell: 1 for cell in sentence.cells}, sentence.count)
+            super().propagate()
+
+            decided = dict()
+            for row_id in self.dirty:
+                if row_id in self.rows:
+                    decided.update(self.bounds(*self.rows[row_id]))
+            self.dirty = set()
+            if not decided:
+                return
+            for cell, mine in decided.items():
+                if mine:
+                    if cell not in self.mines:
+                        self.mark_mine(cell)
+                elif cell not in self.safes:
+                    self.mark_safe(cell)
+
+    def add_row(self, row, total):
+        """
+        Reduces an equation by the rows there are, and adds what's left of
+        it as a new row, eliminating its pivot from every other row.
+        """
+        # RREF rows have no pivots but their own, so each elimination only
+        # brings in cells that aren't pivots
+        for cell in [cell for cell in row if cell in self.pivots]:
+            if cell in row:
+                total = eliminate(row, total, *self.rows[self.pivots[cell]], cell)
+        if not row:
+            return
+        total = normalise(row, total)
+
+        row_id = self.next_row
+        self.next_row += 1
+        pivot = min(row)
+        if row[pivot] < 0:
+            for cell in row:
+                row[cell] = -row[cell]
+            total = -total
+        self.rows[row_id] = (row, total)
+        self.pivots[pivot] = row_id
+        for cell in row:
+            self.columns.setdefault(cell, set()).add(row_id)
+        self.dirty.add(row_id)
+
+        for other_id in list(self.columns[pivot]):
+            if other_id == row_id:
+                continue
+            other, other_total = self.rows[other_id]
+            before = set(other)
+            other_total = eliminate(other, other_total, row, total, pivot)
+            self.update_row(other_id, other, other_total, before)
+
+    def update_row(self, row_id, row, total, before):
+        """
+        Stores a changed row, keeping the column index up to date.
+        """
+        for cell in before - row.keys():
+            rows = self.columns.get(cell)
+            if rows is not None:
+                rows.discard(row_id)
+                if not rows:
+                    del self.columns[cell]
+        if not row:
+            del self.rows[row_id]
+            return
+        for cell in row.keys() - before:
+            self.columns.setdefault(cell, set()).add(row_id)
+        self.rows[row_id] = (row, normalise(row, total))
+        self.dirty.add(row_id)
+
+    def substitute(self, cell, value):
+        """
+        Puts a decided cell's value (1 for a mine, 0 for safe) into every
+        row it's in.
+        """
+        for row_id in self.columns.pop(cell, ()):
+            # (putting in an earlier row may have changed or emptied this one)
+            if row_id not in self.rows:
+                continue
+            row, total = self.rows[row_id]
+            total -= row.pop(cell, 0) * value
+            if self.pivots.get(cell) == row_id:
+                # the row has lost its pivot, so goes in again as new
+                del self.pivots[cell]
+                del self.rows[row_id]
+                for other in row:
+                    self.columns[other].discard(row_id)
+                    if not self.columns[other]:
+                        del self.columns[other]
+                self.add_row(row, total)
+            else:
+                self.update_row(row_id, row, total, set(row) | {cell})
+
+    def bounds(self, row, total):
+        """
+        Returns {cell: 1 for a mine or 0 for safe} for the cells a row
+        decides: if its total is the least (or most) its cells could add up
+        to, every cell has to take the value that gets it there.
+        """
+        lowest = sum(coefficient for coefficient in row.values() if coefficient < 0)
+        highest = sum(coefficient for coefficient in row.values() if coefficient > 0)
+        if total == lowest:
+            return {cell: int(coefficient < 0) for cell, coefficient in row.items()}
+        if total == highest:
+            return {cell: int(coefficient > 0) for cell, coefficient in row.items()}
+        return dict()
+
+
+def eliminate(row, total, pivot_row, pivot_total, pivot):
+    """
+    Removes pivot from row by subtracting a multiple of pivot_row, with
+    both scaled to keep whole numbers. Changes row, and returns its total.
+    """
+    a, b = pivot_row[pivot], row[pivot]
+    for cell in row:
+        row[cell] *= a
+    for cell, coefficient in pivot_row.items():
+        value = row.get(cell, 0) - b * coefficient
+        if value:
+            row[cell] = value
+        else:
+            row.pop(cell, None)
+    return total * a - b * pivot_total
+
+
+def normalise(row, total):
+    """
+    Divides a row by the common factor of its coefficients and total.
+    Changes row, and returns its total.
+    """
+    factor = math.gcd(total, *row.values())
+    if factor > 1:
+        for cell in row:
+            row[cell] //= factor
+        total //= factor
+    return total
+
+
+def convolve(a, b):
+    """
+    Returns the ways to place k mines in two groups of cells together,
+    given the ways to place each number of mines in each group.
+    """
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
@@ -4,9 +4,10 @@ import time
 
 from minesweeper import Minesweeper, MinesweeperAI
 
-HEIGHT = 8
-WIDTH = 8
-MINES = 8
+# Board size and mines: python runner.py [height width mines]
+HEIGHT = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+WIDTH = int(sys.argv[2]) if len(sys.argv) > 2 else HEIGHT
+MINES = int(sys.argv[3]) if len(sys.argv) > 3 else HEIGHT * WIDTH // 8
 
 # Colors
 BLACK = (0, 0, 0)
@@ -17,6 +18,7 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
@@ -28,7 +30,7 @@ largeFont = pygame.font.Font(OPEN_SANS, 40)
 BOARD_PADDING = 20
 board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
 board_height = height - (BOARD_PADDING * 2)
-cell_size = int(min(board_width / WIDTH, board_height / HEIGHT))
+cell_size = max(1, int(min(board_width / WIDTH, board_height / HEIGHT)))
 board_origin = (BOARD_PADDING, BOARD_PADDING)
 
 # Add images
@@ -37,15 +39,126 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+
+def make_tile(content=None):
+    """
+    Returns a cell's surface, drawn once up front: a gray tile with a
+    border, and an image or number on it if given.
+    """
+    tile = pygame.Surface((cell_size, cell_size))
+    tile.fill(GRAY)
+    pygame.draw.rect(tile, WHITE, tile.get_rect(), 3 if cell_size >= 24 else 1)
+    if isinstance(content, int):
+        cellFont = smallFont if cell_size >= 30 else pygame.font.Font(
+            OPEN_SANS, max(6, cell_size * 2 // 3))
+        number = cellFont.render(str(content), True, BLACK)
+        numberRect = number.get_rect()
+        numberRect.center = tile.get_rect().center
+        tile.blit(number, numberRect)
+    elif content is not None:
+        tile.blit(content, (0, 0))
+    return tile
+
+
+# Every look a cell can have, keyed by what's on it
+tiles = {"hidden": make_tile(), "flag": make_tile(flag), "mine": make_tile(mine)}
+for count in range(9):
+    tiles[count] = make_tile(count)
+
+
+def render_button(text, rect):
+    """Returns a button's surface, with its text drawn on it once."""
+    button = pygame.Surface(rect.size)
+    button.fill(WHITE)
+    label = mediumFont.render(text, True, BLACK)
+    labelRect = label.get_rect()
+    labelRect.center = button.get_rect().center
+    button.blit(label, labelRect)
+    return button
+
+
+# Buttons
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+aiButtonSurface = render_button("AI Move", aiButton)
+resetButtonSurface = render_button("Reset", resetButton)
+
+# Where the status text goes
+statusRect = pygame.Rect(
+    (2 / 3) * width, (2 / 3) * height - 25, width / 3, 50
+)
+statusTexts = {text: mediumFont.render(text, True, WHITE)
+               for text in ("", "Lost", "Won")}
+
+
+def cell_rect(cell):
+    i, j = cell
+    return pygame.Rect(
+        board_origin[0] + j * cell_size,
+        board_origin[1] + i * cell_size,
+        cell_size, cell_size
+    )
+
+
+def cell_at(position):
+    """Returns the cell at a screen position, or None if it's off the board."""
+    x, y = position
+    j = int((x - board_origin[0]) // cell_size)
+    i = int((y - board_origin[1]) // cell_size)
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (i, j)
+    return None
+
+
+def cell_look(cell):
+    """Returns the key of the tile to show for a cell."""
+    if lost and game.is_mine(cell):
+        return "mine"
+    if cell in flags:
+        return "flag"
+    if cell in revealed:
+        return game.nearby_mines(cell)
+    return "hidden"
+
+
+def draw_game():
+    """Draws the whole game screen, for when everything has changed."""
+    global status
+    screen.fill(BLACK)
+    for i in range(HEIGHT):
+        for j in range(WIDTH):
+            screen.blit(tiles[cell_look((i, j))], cell_rect((i, j)))
+    screen.blit(aiButtonSurface, aiButton)
+    screen.blit(resetButtonSurface, resetButton)
+    status = None
+
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
 flags = set()
 lost = False
 
+# Cells to draw again this frame, whether the whole screen needs drawing,
+# and the status text currently showing
+dirty = set()
+redraw = True
+status = None
+
+# How long each frame that changed anything took to draw, reported on
+# quitting: frames that only drew what changed, and full redraws
+frame_times = []
+redraw_times = []
+
 # Show instructions initially
 instructions = True
 
@@ -54,38 +167,45 @@ while True:
     # Check if game quit
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            for name, times in [("frame", frame_times), ("redraw", redraw_times)]:
+                if times:
+                    print(f"Mean {name} time {sum(times) / len(times) * 1000:.2f} ms"
+                          f" over {len(times)} {name}s")
             sys.exit()
-
-    screen.fill(BLACK)
+        # the window was uncovered, so whatever was on it is gone
+        elif event.type == pygame.VIDEOEXPOSE:
+            redraw = True
 
     # Show game instructions
     if instructions:
 
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
+        # Draw the instructions only once; they don't change
+        if redraw:
+            screen.fill(BLACK)
+
+            # Title
+            title = largeFont.render("Play Minesweeper", True, WHITE)
+            titleRect = title.get_rect()
+            titleRect.center = ((width / 2), 50)
+            screen.blit(title, titleRect)
+
+            # Rules
+            rules = [
+                "Click a cell to reveal it.",
+                "Right-click a cell to mark it as a mine.",
+                "Mark all mines successfully to win!"
+            ]
+            for i, rule in enumerate(rules):
+                line = smallFont.render(rule, True, WHITE)
+                lineRect = line.get_rect()
+                lineRect.center = ((width / 2), 150 + 30 * i)
+                screen.blit(line, lineRect)
+
+            # Play game button
+            buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+            screen.blit(render_button("Play Game", buttonRect), buttonRect)
+            pygame.display.flip()
+            redraw = False
 
         # Check if play button clicked
         click, _, _ = pygame.mouse.get_pressed()
@@ -93,87 +213,26 @@ while True:
             mouse = pygame.mouse.get_pos()
             if buttonRect.collidepoint(mouse):
                 instructions = False
+                redraw = True
                 time.sleep(0.3)
 
-        pygame.display.flip()
+        clock.tick(60)
         continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
-
     move = None
 
     left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
     if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
+        cell = cell_at(pygame.mouse.get_pos())
+        if cell is not None and cell not in revealed:
+            if cell in flags:
+                flags.remove(cell)
+            else:
+                flags.add(cell)
+            dirty.add(cell)
+            time.sleep(0.2)
 
     elif left == 1:
         mouse = pygame.mouse.get_pos()
@@ -182,12 +241,13 @@ while True:
         if aiButton.collidepoint(mouse) and not lost:
             move = ai.make_safe_move()
             if move is None:
-                move = ai.make_random_move()
+                move = ai.make_best_guess()
                 if move is None:
+                    dirty.update(flags ^ ai.mines)
                     flags = ai.mines.copy()
                     print("No moves left to make.")
                 else:
-                    print("No known safe moves, AI making random move.")
+                    print("No known safe moves, AI making its best guess.")
             else:
                 print("AI making safe move.")
             time.sleep(0.2)
@@ -195,28 +255,62 @@ while True:
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
             revealed = set()
             flags = set()
             lost = False
-            continue
+            redraw = True
 
         # User-made move
         elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
+            cell = cell_at(mouse)
+            if cell is not None and cell not in flags and cell not in revealed:
+                move = cell
 
     # Make move and update AI knowledge
     if move:
         if game.is_mine(move):
             lost = True
+            dirty.update(game.mines)
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            # reveals the whole region around a cell with no nearby mines
+            region = game.reveal(move)
+            revealed.update(region)
+            # none of the region is a mine, so any flags on it were wrong,
+            # and would stop the game being won
+            flags.difference_update(region)
+            dirty.update(region)
+            ai.add_knowledge_many(region.items())
+
+    # Draw only what changed since the last frame
+    start = time.perf_counter()
+    updated = []
+    if redraw:
+        draw_game()
+        dirty = set()
+    for cell in dirty:
+        rect = cell_rect(cell)
+        screen.blit(tiles[cell_look(cell)], rect)
+        updated.append(rect)
+    dirty = set()
+
+    # Display text
+    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    if text != status:
+        screen.fill(BLACK, statusRect)
+        textSurface = statusTexts[text]
+        textRect = textSurface.get_rect()
+        textRect.center = statusRect.center
+        screen.blit(textSurface, textRect)
+        updated.append(statusRect)
+        status = text
+
+    if redraw:
+        pygame.display.flip()
+        redraw = False
+        redraw_times.append(time.perf_counter() - start)
+    elif updated:
+        pygame.display.update(updated)
+        frame_times.append(time.perf_counter() - start)
 
-    pygame.display.flip()
+    clock.tick(60)
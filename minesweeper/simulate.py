@@ -0,0 +1,132 @@
+"""
+Headless Minesweeper games played by the AI, for comparing AI changes.
+
+Plays seeded games across a process pool and reports the win rate, moves
+per game, inference time per move and how big the knowledge base grows.
+
+Usage: python simulate.py [games] [height] [width] [mines] [random|best]
+                          [subsets|linear]
+"""
+
+import concurrent.futures
+import random
+import sys
+import time
+
+from minesweeper import LinearMinesweeperAI, Minesweeper, MinesweeperAI
+
+GAMES = 1000
+HEIGHT = 16
+WIDTH = 16
+MINES = 40
+CHUNK = 20
+SEED = 50
+
+
+ENGINES = {"subsets": MinesweeperAI, "linear": LinearMinesweeperAI}
+
+
+def simulate_game(height, width, mines, guessing, seed, engine="subsets"):
+    """
+    Plays one seeded game and returns a dict of how it went: whether it
+    was won, moves and guesses made, the seconds the AI took to take in
+    each move, and the largest the knowledge base got.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = ENGINES[engine](height=height, width=width, mines=mines)
+    guess = ai.make_best_guess if guessing == "best" else ai.make_random_move
+    safe_cells = height * width - mines
+    stats = {"won": False, "moves": 0, "guesses": 0, "inference": [], "knowledge": 0}
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = guess()
+            if move is None:
+                break
+            stats["guesses"] += 1
+        stats["moves"] += 1
+        if game.is_mine(move):
+            break
+        revealed = game.reveal(move)
+        start = time.perf_counter()
+        ai.add_knowledge_many(revealed.items())
+        stats["inference"].append(time.perf_counter() - start)
+        stats["knowledge"] = max(stats["knowledge"], len(ai.knowledge))
+        if len(ai.moves_made) == safe_cells:
+            stats["won"] = True
+            break
+    return stats
+
+
+def simulate_games(height, width, mines, guessing, seeds, engine="subsets"):
+    """
+    Plays a chunk of the simulation in a worker process: one game on each
+    seed, with their stats returned in seed order.
+    """
+    return [simulate_game(height, width, mines, guessing, seed, engine) for seed in seeds]
+
+
+def simulate(games, height, width, mines, guessing="best", engine="subsets",
+             workers=None, seed=SEED):
+    """Plays games across a process pool and returns each game's stats."""
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(simulate_games, height, width, mines, guessing,
+                        range(seed + start, seed + min(games, start + CHUNK)), engine)
+            for start in range(0, games, CHUNK)
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def inference_times(results):
+    """
+    Returns the mean, median, 99th percentile and slowest of the seconds
+    the AI took to take in a move, over every move of every game.
+    """
+    times = sorted(t for result in results for t in result["inference"])
+    if not times:
+        return 0, 0, 0, 0
+    return (sum(times) / len(times), times[len(times) // 2],
+            times[len(times) * 99 // 100], times[-1])
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else HEIGHT
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else WIDTH
+    mines = int(sys.argv[4]) if len(sys.argv) > 4 else MINES
+    guessing = sys.argv[5] if len(sys.argv) > 5 else "best"
+    engine = sys.argv[6] if len(sys.argv) > 6 else "subsets"
+    if guessing not in ("random", "best"):
+        sys.exit("guessing must be random or best")
+    if engine not in ENGINES:
+        sys.exit("engine must be subsets or linear")
+
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, guessing, engine)
+    seconds = time.perf_counter() - start
+
+    won = sum(result["won"] for result in results)
+    moves = sum(result["moves"] for result in results)
+    guesses = sum(result["guesses"] for result in results)
+    mean, median, p99, slowest = inference_times(results)
+    knowledge = [result["knowledge"] for result in results]
+    print(f"{games} games, {height}x{width} with {mines} mines,"
+          f" {guessing} guessing, {engine} inference, in {seconds:.1f} s")
+    print(f"    won       {won / games:.1%}")
+    print(f"    moves     {moves / games:.1f} per game"
+          f" ({guesses / games:.1f} guesses)")
+    print(f"    inference {mean * 1000:.3f} ms mean,"
+          f" p50 {median * 1000:.3f}"
+          f" / p99 {p99 * 1000:.3f}"
+          f" / max {slowest * 1000:.3f} ms per move")
+    print(f"    knowledge {sum(knowledge) / games:.1f} sentences at most, on average"
+          f" ({max(knowledge)} in the biggest)")
+
+
+if __name__ == "__main__":
+    main()
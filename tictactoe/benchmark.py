@@ -0,0 +1,83 @@
+"""
+Benchmarks for the Tic-Tac-Toe search.
+
+Usage: python benchmark.py
+"""
+
+import time
+
+import tictactoe as ttt
+
+
+def timed_search(search, board):
+    """Returns (move, nodes visited, seconds) for one search."""
+    stats = dict()
+    start = time.perf_counter()
+    move = search(board, stats)
+    seconds = time.perf_counter() - start
+    return move, stats.get("nodes", 0), seconds
+
+
+def bench_first_move():
+    """Compares the searches on the first move from an empty board."""
+    print("First move from an empty board")
+    board = ttt.initial_state()
+    no_table = ttt.TranspositionTable(size=0)
+    table = ttt.TranspositionTable()
+    for name, search in [
+        ("full", ttt.full_minimax),
+        ("alpha-beta", lambda board, stats: ttt.alphabeta(board, stats, no_table)),
+        ("table cold", lambda board, stats: ttt.alphabeta(board, stats, table)),
+        ("table warm", lambda board, stats: ttt.alphabeta(board, stats, table)),
+        ("book", lambda board, stats: ttt.book_entry(board)[0]),
+    ]:
+        move, nodes, seconds = timed_search(search, board)
+        print(f"    {name:12} {move}  {nodes:8} nodes"
+              f"  {seconds * 1000:9.1f} ms"
+              f"  {nodes / seconds:9.0f} nodes/s")
+
+
+def bench_table_sizes():
+    """Plays whole games with transposition tables of different sizes."""
+    print("Whole game, AI against itself")
+    for size in (0, 32, 128, 100000):
+        for policy in ("lru", "fifo"):
+            table = ttt.TranspositionTable(size, policy)
+            board = ttt.initial_state()
+            nodes = 0
+            start = time.perf_counter()
+            while not ttt.terminal(board):
+                stats = dict()
+                board = ttt.result(board, ttt.alphabeta(board, stats, table))
+                nodes += stats.get("nodes", 0)
+            seconds = time.perf_counter() - start
+            print(f"    size {size:6} {policy:4}  {nodes:6} nodes"
+                  f"  {seconds * 1000:8.1f} ms")
+
+
+def bench_big_board(rows=7, cols=7, win_length=4, budget=0.5):
+    """Plays a whole game on a bigger board, AI against itself."""
+    print(f"{rows}x{cols}, {win_length} in a row, {budget}s per move")
+    board = ttt.initial_state(rows, cols)
+    slowest = 0
+    while not ttt.terminal(board, win_length):
+        stats = dict()
+        start = time.perf_counter()
+        move = ttt.deepening_search(board, win_length, budget, stats)
+        seconds = time.perf_counter() - start
+        slowest = max(slowest, seconds)
+        board = ttt.result(board, move)
+        print(f"    {move}  depth {stats.get('depth', 0):2}"
+              f"  {stats.get('nodes', 0):7} nodes  {seconds * 1000:7.1f} ms")
+    print(f"    winner {ttt.winner(board, win_length)},"
+          f" slowest move {slowest * 1000:.1f} ms")
+
+
+def main():
+    bench_first_move()
+    bench_table_sizes()
+    bench_big_board()
+
+
+if __name__ == "__main__":
+    main()
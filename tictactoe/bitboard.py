@@ -0,0 +1,189 @@
+"""
+Bitboard representation of Tic Tac Toe style boards.
+
+A position is two integers: a mask of the cells X holds and a mask of the
+cells O holds, with cell (i, j) at bit i * cols + j. Moves are a single OR
+and win checks are an AND against each precomputed winning line.
+"""
+
+import functools
+
+
+class Geometry:
+    """
+    Everything precomputed for one board shape: rows x cols, where
+    win_length in a row (across, down or diagonally) wins.
+    """
+
+    def __init__(self, rows, cols, win_length):
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+
+        # every line of win_length cells that fits on the board
+        self.wins = []
+        for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            for i in range(rows):
+                for j in range(cols):
+                    end_i = i + di * (win_length - 1)
+                    end_j = j + dj * (win_length - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        mask = 0
+                        for step in range(win_length):
+                            mask |= 1 << ((i + di * step) * cols + j + dj * step)
+                        self.wins.append(mask)
+
+        # the lines through each cell: only those can be completed by a
+        # move there, so they're all a search has to check after a move
+        self.through = [[mask for mask in self.wins if mask >> index & 1]
+                        for index in range(self.cells)]
+        self.cells_through = [
+            [[divmod(bit, cols) for bit in range(self.cells) if mask >> bit & 1]
+             for mask in lines]
+            for lines in self.through
+        ]
+
+        # cells on more winning lines first: for 3x3 that's the centre,
+        # then the corners, then the edges
+        self.order = sorted(range(self.cells),
+                            key=lambda index: -len(self.through[index]))
+
+        # masks to stop shifts wrapping from one row's edge to the next
+        left_column = sum(1 << (i * cols) for i in range(rows))
+        self.not_left = self.full & ~left_column
+        self.not_right = self.full & ~(left_column << (cols - 1))
+
+        # each symmetry as lookup tables that move the bits of one byte
+        # of a mask at a time to where that symmetry puts them
+        self.symmetries = []
+        for symmetry in symmetries(rows, cols):
+            # symmetry lists the source cell of each destination cell
+            destination = [0] * self.cells
+            for target, source in enumerate(symmetry):
+                destination[source] = target
+            tables = []
+            for start in range(0, self.cells, 8):
+                table = []
+                for byte in range(256):
+                    moved = 0
+                    for bit in range(8):
+                        if byte >> bit & 1 and start + bit < self.cells:
+                            moved |= 1 << destination[start + bit]
+                    table.append(moved)
+                tables.append(table)
+            self.symmetries.append(tables)
+
+    def transform(self, mask, tables):
+        """Returns mask with its bits moved by one symmetry's tables."""
+        moved = 0
+        for table in tables:
+            moved |= table[mask & 255]
+            mask >>= 8
+        return moved
+
+    def canonical(self, x, o):
+        """
+        Returns the same (x, o) pair for a position and all of its
+        rotations and reflections.
+        """
+        return min((self.transform(x, tables), self.transform(o, tables))
+                   for tables in self.symmetries)
+
+    def around(self, mask):
+        """Returns the cells next to (or diagonally next to) any in mask."""
+        cols = self.cols
+        # shifting left moves a cell one column right, and vice versa
+        right = (mask & self.not_right) << 1
+        left = (mask & self.not_left) >> 1
+        spread = mask | right | left
+        return (spread | spread << cols | spread >> cols) & self.full & ~mask
+
+    def has_line_through(self, mask, index):
+        """Checks if mask holds a whole winning line through cell index."""
+        for line in self.through[index]:
+            if mask & line == line:
+                return True
+        return False
+
+    def evaluate(self, mine, theirs):
+        """
+        Returns a heuristic score for a position that isn't over, from the
+        point of view of the player holding mine: each line only one
+        player has marks on is worth more the more marks they have on it.
+        """
+        score = 0
+        for line in self.wins:
+            a = mine & line
+            b = theirs & line
+            if a and not b:
+                score += 4 ** count(a)
+            elif b and not a:
+                score -= 4 ** count(b)
+        return score
+
+    def winner(self, x, o):
+        """Returns 1 if X has a line, -1 if O does, or 0 if neither."""
+        for mask in self.wins:
+            if x & mask == mask:
+                return 1
+            if o & mask == mask:
+                return -1
+        return 0
+
+
+@functools.lru_cache(maxsize=None)
+def geometry(rows, cols, win_length):
+    """Returns the (shared) Geometry for a board shape."""
+    return Geometry(rows, cols, win_length)
+
+
+@functools.lru_cache(maxsize=None)
+def symmetries(rows, cols):
+    """
+    Returns the symmetries of a rows x cols board, each as a list of
+    indices into the board's cells (row by row) to read them in. A square
+    board has 8: rotations and reflections. Any other board has 4.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (i, cols - 1 - j),
+        lambda i, j: (rows - 1 - i, j),
+        lambda i, j: (rows - 1 - i, cols - 1 - j),
+    ]
+    if rows == cols:
+        transforms += [
+            lambda i, j: (j, i),
+            lambda i, j: (j, rows - 1 - i),
+            lambda i, j: (cols - 1 - j, i),
+            lambda i, j: (cols - 1 - j, rows - 1 - i),
+        ]
+    cells = [(i, j) for i in range(rows) for j in range(cols)]
+    return [
+        [ti * cols + tj for (ti, tj) in (transform(i, j) for (i, j) in cells)]
+        for transform in transforms
+    ]
+
+
+def count(mask):
+    """Returns the number of cells set in mask."""
+    return bin(mask).count("1")
+
+
+def to_bits(board, marks):
+    """
+    Returns (x, o) masks for a list-of-lists board, where marks is the
+    pair of values X and O use on the board.
+    """
+    x_mark, o_mark = marks
+    x = o = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == x_mark:
+                x |= bit
+            elif cell == o_mark:
+                o |= bit
+            bit <<= 1
+    return x, o
@@ -0,0 +1,82 @@
+"""
+Generates the opening book for 3x3 Tic Tac Toe.
+
+Every position reachable from the empty board is solved once with the live
+search, and its best move and minimax value are written as one byte at the
+position's index (see tictactoe.book_index), so minimax can look them up.
+
+Usage: python book.py [check]
+"""
+
+import math
+import sys
+
+import tictactoe as ttt
+
+
+def reachable(board, found):
+    """Adds every position reachable from board to found, by book index."""
+    index = ttt.book_index(board)
+    if index in found:
+        return
+    found[index] = board
+    if ttt.terminal(board):
+        return
+    for action in ttt.actions(board):
+        reachable(ttt.result(board, action), found)
+
+
+def solve(board, table):
+    """Returns (best move, minimax value) from the live search."""
+    if ttt.terminal(board):
+        return (None, ttt.utility(board))
+    shape = ttt.geometry(board)
+    x, o = ttt.to_bits(board)
+    value = ttt.alphabeta_value(shape, x, o, ttt.player(board) == ttt.X,
+                                -math.inf, math.inf, None, table)
+    return (ttt.alphabeta(board, None, table), value)
+
+
+def generate(path=ttt.BOOK):
+    """Writes the opening book, and returns the number of positions."""
+    found = dict()
+    reachable(ttt.initial_state(), found)
+    table = ttt.TranspositionTable()
+    book = bytearray([ttt.NOT_IN_BOOK] * 3 ** 9)
+    for index, board in found.items():
+        move, value = solve(board, table)
+        move = ttt.NO_MOVE if move is None else move[0] * 3 + move[1]
+        book[index] = (move << 2) | (value + 1)
+    with open(path, "wb") as f:
+        f.write(book)
+    return len(found)
+
+
+def check():
+    """
+    Compares the book with the live search in every reachable position.
+    Returns the number of positions that disagree.
+    """
+    found = dict()
+    reachable(ttt.initial_state(), found)
+    table = ttt.TranspositionTable()
+    mismatches = 0
+    for board in found.values():
+        if ttt.book_entry(board) != solve(board, table):
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        mismatches = check()
+        print(f"{mismatches} positions disagree with the live search")
+        if mismatches:
+            sys.exit(1)
+    else:
+        positions = generate()
+        print(f"Wrote {positions} positions to {ttt.BOOK}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import pygame
 import sys
+import threading
 import time
 
 import tictactoe as ttt
 
+# Board size and how many in a row win: python runner.py [rows cols k]
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+COLS = int(sys.argv[2]) if len(sys.argv) > 2 else ROWS
+WIN_LENGTH = int(sys.argv[3]) if len(sys.argv) > 3 else min(3, ROWS, COLS)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,43 +21,128 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Shrink the tiles to fit bigger boards on the screen
+tile_size = min(80, (height - 150) // ROWS, (width - 40) // COLS)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+
+# Where the board goes, and each tile's square on the screen
+tile_origin = (width / 2 - (COLS / 2 * tile_size),
+               height / 2 - (ROWS / 2 * tile_size))
+tiles = [
+    [pygame.Rect(tile_origin[0] + j * tile_size, tile_origin[1] + i * tile_size,
+                 tile_size, tile_size)
+     for j in range(COLS)]
+    for i in range(ROWS)
+]
+
+
+def render_tile(mark):
+    """Returns a tile's surface, with its border and mark drawn on it once."""
+    tile = pygame.Surface((tile_size, tile_size))
+    tile.fill(black)
+    pygame.draw.rect(tile, white, tile.get_rect(), 3)
+    if mark != ttt.EMPTY:
+        move = moveFont.render(mark, True, white)
+        moveRect = move.get_rect()
+        moveRect.center = tile.get_rect().center
+        tile.blit(move, moveRect)
+    return tile
+
+
+def render_button(text, rect):
+    """Returns a button's surface, with its text drawn on it once."""
+    button = pygame.Surface(rect.size)
+    button.fill(white)
+    label = mediumFont.render(text, True, black)
+    labelRect = label.get_rect()
+    labelRect.center = button.get_rect().center
+    button.blit(label, labelRect)
+    return button
+
+
+# Everything that gets drawn more than once, drawn once up front
+tileSurfaces = {mark: render_tile(mark) for mark in (ttt.EMPTY, ttt.X, ttt.O)}
+playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
+playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
+againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+buttonSurfaces = {
+    text: render_button(text, rect) for text, rect in [
+        ("Play as X", playXButton), ("Play as O", playOButton),
+        ("Play Again", againButton), ("Reset", againButton),
+    ]
+}
+titleArea = pygame.Rect(0, 0, width, 60)
+titleSurfaces = dict()
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(ROWS, COLS)
+
+# What's on the screen now, so each frame only draws what has changed:
+# the marks on the tiles, the title and the button label. Drawing
+# everything again is only needed when the screen changes, or the
+# window is uncovered.
+shown = None
+shownTitle = None
+shownButton = None
+redraw = True
+
+# The board the game state was last worked out for
+checked = None
+
+# The AI searches in a background thread so the window keeps responding:
+# the thread leaves its move in search["move"] (or what went wrong in
+# search["error"]) for the loop to pick up
+search = None
+clock = pygame.time.Clock()
+
+
+def start_search(board):
+    """Starts the AI searching for a move on board, in the background."""
+    state = {"board": board, "move": None, "cancel": threading.Event()}
+
+    def run():
+        try:
+            state["move"] = ttt.minimax(board, WIN_LENGTH, cancel=state["cancel"])
+        except Exception as error:
+            # raised again by the loop, so it isn't lost in this thread
+            state["error"] = error
+        finally:
+            state["done"] = True
+
+    state["thread"] = threading.Thread(target=run, daemon=True)
+    state["thread"].start()
+    return state
+
+
+def cancel_search(search):
+    """Stops a background search early; its move will be ignored."""
+    if search is not None:
+        search["cancel"].set()
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
-
-    screen.fill(black)
+        elif event.type == pygame.VIDEOEXPOSE:
+            redraw = True
 
     # Let user choose a player.
     if user is None:
 
-        # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Draw buttons
-        playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
-        playX = mediumFont.render("Play as X", True, black)
-        playXRect = playX.get_rect()
-        playXRect.center = playXButton.center
-        pygame.draw.rect(screen, white, playXButton)
-        screen.blit(playX, playXRect)
-
-        playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
-        playO = mediumFont.render("Play as O", True, black)
-        playORect = playO.get_rect()
-        playORect.center = playOButton.center
-        pygame.draw.rect(screen, white, playOButton)
-        screen.blit(playO, playORect)
+        # Draw title and buttons, which don't change
+        if redraw:
+            screen.fill(black)
+            title = largeFont.render("Play Tic-Tac-Toe", True, white)
+            titleRect = title.get_rect()
+            titleRect.center = ((width / 2), 50)
+            screen.blit(title, titleRect)
+            screen.blit(buttonSurfaces["Play as X"], playXButton)
+            screen.blit(buttonSurfaces["Play as O"], playOButton)
+            pygame.display.flip()
+            redraw = False
 
         # Check if button is clicked
         click, _, _ = pygame.mouse.get_pressed()
@@ -60,87 +151,97 @@ while True:
             if playXButton.collidepoint(mouse):
                 time.sleep(0.2)
                 user = ttt.X
+                redraw = True
             elif playOButton.collidepoint(mouse):
                 time.sleep(0.2)
                 user = ttt.O
+                redraw = True
 
-    else:
+        clock.tick(30)
+        continue
 
-        # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
-        tiles = []
-        for i in range(3):
-            row = []
-            for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                pygame.draw.rect(screen, white, rect, 3)
-
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
-                    moveRect = move.get_rect()
-                    moveRect.center = rect.center
-                    screen.blit(move, moveRect)
-                row.append(rect)
-            tiles.append(row)
-
-        game_over = ttt.terminal(board)
+    # Work out the state of the game when the board changes
+    if board is not checked:
+        game_over = ttt.terminal(board, WIN_LENGTH)
         player = ttt.player(board)
+        winner = ttt.winner(board, WIN_LENGTH) if game_over else None
+        checked = board
 
-        # Show title
-        if game_over:
-            winner = ttt.winner(board)
-            if winner is None:
-                title = f"Game Over: Tie."
-            else:
-                title = f"Game Over: {winner} wins."
-        elif user == player:
-            title = f"Play as {user}"
+    # Show title
+    if game_over:
+        if winner is None:
+            title = f"Game Over: Tie."
         else:
-            title = f"Computer thinking..."
-        title = largeFont.render(title, True, white)
-        titleRect = title.get_rect()
+            title = f"Game Over: {winner} wins."
+    elif user == player:
+        title = f"Play as {user}"
+    else:
+        # animate the dots so it's clear the window hasn't frozen
+        dots = "." * (int(time.time() * 3) % 4)
+        title = f"Computer thinking{dots:3}"
+    button = "Play Again" if game_over else "Reset"
+
+    # Draw only what changed since the last frame
+    updated = []
+    if redraw:
+        screen.fill(black)
+        shown = [[None] * COLS for _ in range(ROWS)]
+        shownTitle = shownButton = None
+    for i in range(ROWS):
+        for j in range(COLS):
+            if shown[i][j] != board[i][j]:
+                screen.blit(tileSurfaces[board[i][j]], tiles[i][j])
+                shown[i][j] = board[i][j]
+                updated.append(tiles[i][j])
+    if title != shownTitle:
+        if title not in titleSurfaces:
+            titleSurfaces[title] = largeFont.render(title, True, white)
+        screen.fill(black, titleArea)
+        titleRect = titleSurfaces[title].get_rect()
         titleRect.center = ((width / 2), 30)
-        screen.blit(title, titleRect)
-
-        # Check for AI move
-        if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
-
-        # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
-            mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
-
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
-
-    pygame.display.flip()
+        screen.blit(titleSurfaces[title], titleRect)
+        shownTitle = title
+        updated.append(titleArea)
+    if button != shownButton:
+        screen.blit(buttonSurfaces[button], againButton)
+        shownButton = button
+        updated.append(againButton)
+    if redraw:
+        pygame.display.flip()
+        redraw = False
+    elif updated:
+        pygame.display.update(updated)
+
+    # Check for AI move, without waiting for it
+    if user != player and not game_over:
+        if search is None:
+            search = start_search(board)
+        elif search.get("done"):
+            if "error" in search:
+                raise search["error"]
+            board = ttt.result(board, search["move"])
+            search = None
+
+    # Check for a user move
+    click, _, _ = pygame.mouse.get_pressed()
+    if click == 1 and user == player and not game_over:
+        mouse = pygame.mouse.get_pos()
+        for i in range(ROWS):
+            for j in range(COLS):
+                if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
+                    board = ttt.result(board, (i, j))
+
+    # Play again when the game is over, or start over part way through
+    # (even while the computer is thinking)
+    click, _, _ = pygame.mouse.get_pressed()
+    if click == 1:
+        mouse = pygame.mouse.get_pos()
+        if againButton.collidepoint(mouse):
+            time.sleep(0.2)
+            user = None
+            board = ttt.initial_state(ROWS, COLS)
+            cancel_search(search)
+            search = None
+            redraw = True
+
+    clock.tick(30)
@@ -2,32 +2,52 @@
 Tic Tac Toe Player
 """
 
-import copy
+import collections
 import math
+import mmap
+import os
+import time
+
+import bitboard
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Opening book for the 3x3 game, written by book.py
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+# Book entry for a position that isn't in it, and move for "no move"
+NOT_IN_BOOK = 0xFF
+NO_MOVE = 0xF
+
+# Depth-limited search, for boards too big to search to the end: a win is
+# worth more than any heuristic score, and each move has a time budget
+WIN_SCORE = 1000000
+MOVE_BUDGET = 1.0
+
+# How a stored search value relates to the true minimax value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
 
-def initial_state():
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    blanks = 0
-    for row in board:
-        blanks += row.count(EMPTY)
-    if blanks % 2 == 1:
-        return X  # ODD blanks for X eg. 9 blanks, X goes first
+    # X goes first, so it's X's turn whenever both have made as many moves
+    x, o = to_bits(board)
+    if bitboard.count(x) == bitboard.count(o):
+        return X
     else:
-        return O  # EVEN blanks for O
+        return O
 
 
 def actions(board):
@@ -54,43 +74,32 @@ def result(board, action):
         raise Exception("Out of bounds")
     if board[i][j] != EMPTY:
         raise Exception("Invalid move")
-    new_board = copy.deepcopy(board)
+    new_board = [row[:] for row in board]
     new_board[i][j] = mark
     return new_board
 
 
-def winner(board):
+def winner(board, win_length=3):
     """
     Returns the winner of the game, if there is one.
     """
-    # ok, I over-engineered this
-    # it's looking for a chain of 3 that fits on the board from the starting position
-    win_length = 3
-    # these are all the directions it can search
-    directions = [
-        (-1, 0),
-        (-1, -1),
-        (0, -1),
-        (1, -1),
-        (1, 0),
-        (1, -1),
-        (0, -1),
-        (-1, -1),
-    ]
-    # step through the board
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            # look at the token in the cell
-            token = board[i][j]
-            # if it's not empty, explore it for all possible win chains
-            if token != EMPTY:
-                # every direction
-                for direction in directions:
-                    # check if there's a win from this cell in that direction
-                    win = check_win_chain(board, token, (i, j), direction, win_length)
-                    if win:
-                        return token
-    return None
+    win = geometry(board, win_length).winner(*to_bits(board))
+    return X if win == 1 else O if win == -1 else None
+
+
+def to_bits(board):
+    """
+    Returns the board as a pair of bitboards: the cells X holds, and the
+    cells O holds.
+    """
+    return bitboard.to_bits(board, (X, O))
+
+
+def geometry(board, win_length=3):
+    """
+    Returns the precomputed bitboard geometry for the board's size.
+    """
+    return bitboard.geometry(len(board), len(board[0]), win_length)
 
 
 def check_win_chain(board, token, start, direction, length):
@@ -121,50 +130,136 @@ def check_win_chain(board, token, start, direction, length):
     return False
 
 
-def terminal(board):
+def terminal(board, win_length=3):
     """
     Returns True if game is over, False otherwise.
     """
     # if there's a winner, or no more moves, the game is over
-    return (winner(board) is not None) or (len(actions(board)) == 0)
+    x, o = to_bits(board)
+    shape = geometry(board, win_length)
+    return shape.winner(x, o) != 0 or (x | o) == shape.full
 
 
-def utility(board):
+def utility(board, win_length=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # a simple utility function based on the winner
-    win = winner(board)
-    utility = 1 if win == X else -1 if win == O else 0
-    return utility
+    # the bitboard winner is already 1, -1 or 0
+    return geometry(board, win_length).winner(*to_bits(board))
 
 
-def minimax(board):
+def minimax(board, win_length=3, budget=MOVE_BUDGET, cancel=None):
     """
     Returns the optimal action for the current player on the board.
+    The 3x3 game is solved exactly; on any other board, the best move
+    found within the time budget (in seconds) is returned, or found
+    before cancel (a threading.Event) is set.
+    """
+    if len(board) == 3 and len(board[0]) == 3 and win_length == 3:
+        entry = book_entry(board)
+        if entry is not None:
+            return entry[0]
+        return alphabeta(board)
+    return deepening_search(board, win_length, budget, cancel=cancel)
+
+
+# the opening book, mapped into memory the first time it's needed,
+# or False if there isn't one
+_book = None
+
+
+def book_index(board):
+    """
+    Returns the position's index in the opening book: each cell is a
+    digit of a base 3 number, 0 for empty, 1 for X and 2 for O.
+    """
+    index = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            index = index * 3 + (1 if cell == X else 2 if cell == O else 0)
+    return index
+
+
+def book_entry(board):
+    """
+    Returns (best move, minimax value) for a 3x3 board from the opening
+    book, or None if there's no book or the board isn't in it.
+    """
+    global _book
+    if len(board) != 3 or any(len(row) != 3 for row in board):
+        return None
+    if _book is None:
+        try:
+            with open(BOOK, "rb") as f:
+                _book = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            _book = False
+    if not _book:
+        return None
+    index = book_index(board)
+    if index >= len(_book) or _book[index] == NOT_IN_BOOK:
+        return None
+    move, value = _book[index] >> 2, (_book[index] & 3) - 1
+    return (None if move == NO_MOVE else divmod(move, 3), value)
+
+
+def full_minimax(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the whole game tree without pruning.
     """
     if terminal(board):
         return None
     else:
         # X wants to maximise, O wants to minimise
         # each function returns a value and an action
+        # from here on only the last move can end the game, so the
+        # searches keep count of empty cells rather than rescanning
+        empty = sum(row.count(EMPTY) for row in board)
         if player(board) == X:
-            (v, action) = max_value_and_move(board)
+            (v, action) = max_value_and_move(board, stats, None, empty)
             return action
         else:
-            (v, action) = min_value_and_move(board)
+            (v, action) = min_value_and_move(board, stats, None, empty)
             return action
 
 
-def max_value_and_move(board):
-    if terminal(board):
-        return (utility(board), None)
+def last_move_result(board, last, empty):
+    """
+    Returns the utility of the board if the last move, made at cell last,
+    ended the game, or None if it didn't. Only the lines through that
+    cell can have been completed, and empty is the count of empty cells.
+    """
+    if last is not None:
+        i, j = last
+        mark = board[i][j]
+        for line in geometry(board).cells_through[i * len(board[0]) + j]:
+            for r, c in line:
+                if board[r][c] != mark:
+                    break
+            else:
+                return 1 if mark == X else -1
+    if empty == 0:
+        return 0
+    return None
+
+
+def max_value_and_move(board, stats=None, last=None, empty=None):
+    count_node(stats)
+    if empty is None:
+        if terminal(board):
+            return (utility(board), None)
+        empty = sum(row.count(EMPTY) for row in board)
+    else:
+        v = last_move_result(board, last, empty)
+        if v is not None:
+            return (v, None)
     best_v = -math.inf
     best_move = None
     # check each action on the board
     for action in actions(board):
-        new_board = result(board, action)
-        v = max(best_v, min_value_and_move(new_board)[0])
+        new_board = place(board, action, X)
+        v = max(best_v, min_value_and_move(new_board, stats, action, empty - 1)[0])
         # if this is better than the move that came before
         # keep it, and continue to check the rest
         if v > best_v:
@@ -173,18 +268,313 @@ def max_value_and_move(board):
     return (best_v, best_move)
 
 
-def min_value_and_move(board):
-    if terminal(board):
-        return (utility(board), None)
+def min_value_and_move(board, stats=None, last=None, empty=None):
+    count_node(stats)
+    if empty is None:
+        if terminal(board):
+            return (utility(board), None)
+        empty = sum(row.count(EMPTY) for row in board)
+    else:
+        v = last_move_result(board, last, empty)
+        if v is not None:
+            return (v, None)
     best_v = math.inf
     best_move = None
     # check each action on the board
     for action in actions(board):
-        new_board = result(board, action)
-        v = min(best_v, max_value_and_move(new_board)[0])
+        new_board = place(board, action, O)
+        v = min(best_v, max_value_and_move(new_board, stats, action, empty - 1)[0])
         # if this is better than the move that came before
         # keep it, and continue to check the rest
         if v < best_v:
             best_v = v
             best_move = action
     return (best_v, best_move)
+
+
+def place(board, action, mark):
+    """
+    Returns the board with mark at action, for searches that already know
+    whose turn it is and that the move is legal, unlike result().
+    """
+    (i, j) = action
+    new_board = [row[:] for row in board]
+    new_board[i][j] = mark
+    return new_board
+
+
+def count_node(stats):
+    """
+    Counts a node visited by a search, if the caller asked for stats.
+    """
+    if stats is not None:
+        stats["nodes"] = stats.get("nodes", 0) + 1
+
+
+def canonical(board, win_length=3):
+    """
+    Returns a key for the board that is the same for all of its rotations
+    and reflections, which all have the same minimax value.
+    """
+    shape = geometry(board, win_length)
+    return (shape.rows, shape.cols, shape.win_length) + shape.canonical(*to_bits(board))
+
+
+class TranspositionTable:
+    """
+    Cache of search results, keyed by canonical board, so positions reached
+    by different move orders (or as reflections of each other) are only
+    searched once. It holds at most `size` entries; when it's full, the
+    policy decides which one goes: "lru" evicts the least recently used
+    entry, and "fifo" the one stored first. A size of 0 turns it off.
+    """
+
+    def __init__(self, size=100000, policy="lru"):
+        if policy not in ("lru", "fifo"):
+            raise ValueError(f"unknown eviction policy {policy}")
+        self.size = size
+        self.policy = policy
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and self.policy == "lru":
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if self.size <= 0:
+            return
+        if key in self.entries:
+            if self.policy == "lru":
+                self.entries.move_to_end(key)
+        elif len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+        self.entries[key] = entry
+
+    def clear(self):
+        self.entries.clear()
+
+
+# shared by every search in the process, so later moves in a game are
+# answered from what earlier searches found
+transpositions = TranspositionTable()
+
+
+def alphabeta(board, stats=None, table=None, win_length=3):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta pruning and a transposition table (by default, the
+    one shared by the whole process).
+    """
+    if table is None:
+        table = transpositions
+    if terminal(board, win_length):
+        return None
+    shape = geometry(board, win_length)
+    x, o = to_bits(board)
+    maximising = player(board) == X
+    best_v = -math.inf if maximising else math.inf
+    best_move = None
+    alpha, beta = -math.inf, math.inf
+    count_node(stats)
+    # the top level goes through the actions in the same order as the
+    # full search, and only takes strictly better moves, so it picks the
+    # same move out of several equally good ones
+    for action in actions(board):
+        index = action[0] * shape.cols + action[1]
+        bit = 1 << index
+        if maximising:
+            v = alphabeta_value(shape, x | bit, o, False, alpha, beta, stats, table, index)
+        else:
+            v = alphabeta_value(shape, x, o | bit, True, alpha, beta, stats, table, index)
+        if maximising and v > best_v:
+            best_v, best_move = v, action
+            alpha = v
+        elif not maximising and v < best_v:
+            best_v, best_move = v, action
+            beta = v
+    return best_move
+
+
+def alphabeta_value(shape, x, o, x_to_move, alpha, beta, stats=None, table=None,
+                    last=None):
+    """
+    Returns the minimax value of the bitboard position, or a bound on it
+    outside the window between alpha and beta. If last is the cell the
+    last move was made in, only the lines through it are checked for a win.
+    """
+    count_node(stats)
+    if last is None:
+        win = shape.winner(x, o)
+        if win != 0:
+            return win
+    elif x_to_move:
+        if shape.has_line_through(o, last):
+            return -1
+    elif shape.has_line_through(x, last):
+        return 1
+    taken = x | o
+    if taken == shape.full:
+        return 0
+
+    # a stored result settles it if it's exact, or a bound outside the window
+    if table is not None:
+        key = (shape.rows, shape.cols, shape.win_length) + shape.canonical(x, o)
+        entry = table.get(key)
+        if entry is not None:
+            value, bound = entry
+            if (bound == EXACT
+                    or (bound == LOWER and value >= beta)
+                    or (bound == UPPER and value <= alpha)):
+                if stats is not None:
+                    stats["hits"] = stats.get("hits", 0) + 1
+                return value
+    window = (alpha, beta)
+
+    if x_to_move:
+        v = -math.inf
+        for index in shape.order:
+            bit = 1 << index
+            if taken & bit:
+                continue
+            v = max(v, alphabeta_value(shape, x | bit, o, False, alpha, beta, stats, table, index))
+            # O already has a better option elsewhere, so won't come here
+            if v >= beta:
+                break
+            alpha = max(alpha, v)
+    else:
+        v = math.inf
+        for index in shape.order:
+            bit = 1 << index
+            if taken & bit:
+                continue
+            v = min(v, alphabeta_value(shape, x, o | bit, True, alpha, beta, stats, table, index))
+            # X already has a better option elsewhere, so won't come here
+            if v <= alpha:
+                break
+            beta = min(beta, v)
+
+    if table is not None:
+        bound = UPPER if v <= window[0] else LOWER if v >= window[1] else EXACT
+        table.put(key, (v, bound))
+    return v
+
+
+class OutOfTime(Exception):
+    pass
+
+
+class Deadline():
+    """
+    When a search has to stop: after budget seconds, or as soon as
+    cancel (a threading.Event, if given) is set from another thread.
+    """
+
+    def __init__(self, budget, cancel=None):
+        self.end = time.perf_counter() + budget
+        self.cancel = cancel
+
+    def passed(self):
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return time.perf_counter() > self.end
+
+
+def deepening_search(board, win_length=3, budget=MOVE_BUDGET, stats=None,
+                     cancel=None):
+    """
+    Returns the best action found for the current player on the board by
+    iterative deepening: searching 1 move ahead, then 2, and so on, scoring
+    positions at the depth limit heuristically, until the time budget (in
+    seconds) runs out or cancel is set. The move from the deepest finished
+    search is used.
+    """
+    if terminal(board, win_length):
+        return None
+    shape = geometry(board, win_length)
+    x, o = to_bits(board)
+    mine, theirs = (x, o) if player(board) == X else (o, x)
+    deadline = Deadline(budget, cancel)
+
+    moves = candidate_moves(shape, mine, theirs)
+    best = moves[0]
+    # with only one move to make, there's nothing to search for
+    if len(moves) == 1:
+        return divmod(best, shape.cols)
+    for depth in range(1, shape.cells - bitboard.count(mine | theirs) + 1):
+        try:
+            score, move = search_root(shape, mine, theirs, moves, depth,
+                                      deadline, stats)
+        except OutOfTime:
+            break
+        best = move
+        if stats is not None:
+            stats["depth"] = depth
+        # try the best move first next time, which makes pruning work better
+        moves.remove(move)
+        moves.insert(0, move)
+        # a forced win or loss won't change with a deeper search
+        if abs(score) > WIN_SCORE - shape.cells:
+            break
+    return divmod(best, shape.cols)
+
+
+def candidate_moves(shape, mine, theirs):
+    """
+    Returns the cells worth considering as moves, most promising first:
+    on a big board, only the empty cells next to a mark already there.
+    """
+    taken = mine | theirs
+    if not taken:
+        return [shape.order[0]]
+    near = shape.around(taken)
+    return [index for index in shape.order if near >> index & 1]
+
+
+def search_root(shape, mine, theirs, moves, depth, deadline, stats=None):
+    """
+    Returns (score, move) for the best of moves, searching depth moves ahead.
+    """
+    alpha, beta = -math.inf, math.inf
+    best_score, best_move = -math.inf, moves[0]
+    for index in moves:
+        score = -negamax(shape, theirs, mine | 1 << index, index, depth - 1,
+                         -beta, -alpha, 1, deadline, stats)
+        if score > best_score:
+            best_score, best_move = score, index
+        alpha = max(alpha, score)
+    return best_score, best_move
+
+
+def negamax(shape, mine, theirs, last, depth, alpha, beta, ply, deadline,
+            stats=None):
+    """
+    Returns the score of the position for the player to move, who holds
+    mine, searching depth moves ahead. The other player has just moved,
+    in cell last.
+    """
+    count_node(stats)
+    # only the move just made can have won; sooner wins score higher
+    if shape.has_line_through(theirs, last):
+        return -(WIN_SCORE - ply)
+    taken = mine | theirs
+    if taken == shape.full:
+        return 0
+    if depth == 0:
+        return shape.evaluate(mine, theirs)
+    if deadline.passed():
+        raise OutOfTime()
+
+    best = -math.inf
+    for index in candidate_moves(shape, mine, theirs):
+        score = -negamax(shape, theirs, mine | 1 << index, index, depth - 1,
+                         -beta, -alpha, ply + 1, deadline, stats)
+        best = max(best, score)
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return best
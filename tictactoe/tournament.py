@@ -0,0 +1,128 @@
+"""
+Headless self-play between Tic-Tac-Toe agents.
+
+Every ordered pair of agents plays the given number of games, spread over
+a process pool. Perfect agents should never lose, so the results double as
+a check on the search; the move timings and node counts show its cost.
+
+Usage: python tournament.py [games] [agent ...]
+Agents: minimax, alphabeta, full, book, random (default: all but full)
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+GAMES = 1000
+CHUNK = 50
+SEED = 50
+
+
+def random_agent(board, stats, rng):
+    # sorted, so the same seed always picks the same move
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+AGENTS = {
+    # each takes (board, stats, rng) and returns a move
+    "minimax": lambda board, stats, rng: ttt.minimax(board),
+    "alphabeta": lambda board, stats, rng: ttt.alphabeta(board, stats),
+    "full": lambda board, stats, rng: ttt.full_minimax(board, stats),
+    "book": lambda board, stats, rng: ttt.book_entry(board)[0],
+    "random": random_agent,
+}
+
+
+def play_game(x_agent, o_agent, seed):
+    """
+    Plays one game and returns (winner, moves), where moves lists
+    (agent, seconds, nodes) for each move made.
+    """
+    rng = random.Random(seed)
+    board = ttt.initial_state()
+    moves = []
+    while not ttt.terminal(board):
+        name = x_agent if ttt.player(board) == ttt.X else o_agent
+        stats = dict()
+        start = time.perf_counter()
+        move = AGENTS[name](board, stats, rng)
+        seconds = time.perf_counter() - start
+        moves.append((name, seconds, stats.get("nodes", 0)))
+        board = ttt.result(board, move)
+    return ttt.winner(board), moves
+
+
+def play_games(x_agent, o_agent, seeds):
+    """Plays one game per seed, for running in a worker process."""
+    return [play_game(x_agent, o_agent, seed) for seed in seeds]
+
+
+def percentile(values, p):
+    """Returns the p-th percentile of sorted values (nearest rank)."""
+    if not values:
+        return 0
+    rank = max(0, min(len(values) - 1, int(round(p / 100 * len(values))) - 1))
+    return values[rank]
+
+
+def tournament(agents, games=GAMES, workers=None, seed=SEED):
+    """
+    Plays games between every ordered pair of agents and returns
+    (outcomes, moves): outcomes maps (x agent, o agent) to a Counter of
+    winners (None for a tie), and moves maps each agent to a list of
+    (seconds, nodes) for every move it made.
+    """
+    outcomes = collections.defaultdict(collections.Counter)
+    moves = collections.defaultdict(list)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = dict()
+        for x_agent, o_agent in itertools.product(agents, repeat=2):
+            for start in range(0, games, CHUNK):
+                seeds = [seed + i for i in range(start, min(games, start + CHUNK))]
+                future = pool.submit(play_games, x_agent, o_agent, seeds)
+                futures[future] = (x_agent, o_agent)
+        for future in concurrent.futures.as_completed(futures):
+            pairing = futures[future]
+            for winner, played in future.result():
+                outcomes[pairing][winner] += 1
+                for name, seconds, nodes in played:
+                    moves[name].append((seconds, nodes))
+    return outcomes, moves
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    agents = sys.argv[2:] or ["minimax", "alphabeta", "book", "random"]
+    for name in agents:
+        if name not in AGENTS:
+            sys.exit(f"unknown agent {name!r}, try one of {', '.join(AGENTS)}")
+
+    start = time.perf_counter()
+    outcomes, moves = tournament(agents, games)
+    seconds = time.perf_counter() - start
+    print(f"{games} games per pairing in {seconds:.1f} s")
+
+    print("Outcomes (X agent vs O agent: X wins / O wins / ties)")
+    for x_agent, o_agent in itertools.product(agents, repeat=2):
+        counts = outcomes[(x_agent, o_agent)]
+        print(f"    {x_agent:>10} vs {o_agent:10}"
+              f"  {counts[ttt.X]:6} / {counts[ttt.O]:6} / {counts[None]:6}")
+
+    print("Moves (latency p50 / p90 / p99, mean nodes)")
+    for name in agents:
+        latencies = sorted(seconds for seconds, _ in moves[name])
+        nodes = sum(count for _, count in moves[name])
+        print(f"    {name:10} {len(latencies):8} moves"
+              f"  {percentile(latencies, 50) * 1000:8.3f}"
+              f" / {percentile(latencies, 90) * 1000:8.3f}"
+              f" / {percentile(latencies, 99) * 1000:8.3f} ms"
+              f"  {nodes / max(1, len(latencies)):8.1f} nodes")
+
+
+if __name__ == "__main__":
+    main()